@@ -1,9 +1,14 @@
 import discord
 from discord.ext import commands
-import os
 import random
 import asyncio
 from pws import discord_token
+from sound_catalog import SoundCatalog
+from opus_cache import build_cache
+from audio_cache import AudioCache
+from sound_pack import load_pack
+from mixer import MixerSource
+from settings import AUDIO_CACHE_MAX_MB, MIXER_MAX_VOICES
 
 # Intents
 intents = discord.Intents.default()
@@ -13,15 +18,14 @@ intents.voice_states = True
 bot = commands.Bot(command_prefix="/", intents=intents)
 
 # Load sounds from 'sounds' directory
-sound_map = {}
-for category in os.listdir('sounds'):
-    category_path = os.path.join('sounds', category)
-    if os.path.isdir(category_path):
-        for sound_file in os.listdir(category_path):
-            if sound_file.startswith('.') or not sound_file.lower().endswith(('.mp3', '.wav', '.ogg', '.m4a')):
-                continue
-            key = f"{category}-{os.path.splitext(sound_file)[0]}"
-            sound_map[key] = os.path.join(category_path, sound_file)
+catalog = SoundCatalog().load()
+sound_map = catalog.sound_map
+
+# In-memory cache of encoded sounds, keyed by sound_map entry
+audio_cache = AudioCache(AUDIO_CACHE_MAX_MB * 1024 * 1024, pack=load_pack())
+
+# One mixer per guild so overlapping sounds play together
+mixers = {}
 
 # Helper: Connect to user's voice channel
 async def connect_to_user(ctx):
@@ -45,9 +49,14 @@ async def play(ctx, *, sound: str):
     if not sound_file:
         await ctx.send("Sound not found!")
         return
-    if vc.is_playing():
-        vc.stop()
-    vc.play(discord.FFmpegPCMAudio(sound_file))
+    mixer = mixers.setdefault(ctx.guild.id, MixerSource(MIXER_MAX_VOICES))
+    source = audio_cache.source(sound, sound_file)
+    if not mixer.add(source, name=sound):
+        # An ffmpeg fallback source owns a child process
+        source.cleanup()
+        await ctx.send("Too many sounds playing!")
+        return
+    mixer.ensure_playing(vc, bot.loop)
     await ctx.send(f"Playing: {sound}")
 
 # List available sounds
@@ -63,10 +72,23 @@ async def leave(ctx):
     """Disconnect the bot from voice"""
     if ctx.voice_client:
         await ctx.voice_client.disconnect()
+        clear_mixer(ctx.guild.id)
         await ctx.send("Disconnected.")
     else:
         await ctx.send("I'm not in a voice channel.")
 
+def clear_mixer(guild_id):
+    """Drop a guild's mixer so sounds cut off by a disconnect don't resume or hold voices"""
+    mixer = mixers.pop(guild_id, None)
+    if mixer is not None:
+        mixer.clear()
+
+@bot.event
+async def on_voice_state_update(member, before, after):
+    # The bot was disconnected, also when kicked or moved out by someone else
+    if member.id == bot.user.id and before.channel and not after.channel:
+        clear_mixer(member.guild.id)
+
 # Basic error handler
 @bot.event
 async def on_command_error(ctx, error):
@@ -75,5 +97,6 @@ async def on_command_error(ctx, error):
 @bot.event
 async def on_ready():
     print(f"Bot connected as {bot.user}")
+    await asyncio.to_thread(build_cache, list(sound_map.values()))
 
 bot.run(discord_token) 
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+Bounded in-memory audio cache
+Keeps the Opus packets of recently played sounds in RAM, keyed by their
+sound_map entry, so repeat plays cost no disk I/O and no decode. Sounds
+found in the memory-mapped sound pack are served from it without using the
+RAM budget at all.
+"""
+
+import threading
+from collections import OrderedDict
+
+import discord
+
+from opus_cache import cache_path_for, is_cached, load_packets
+
+
+class PacketBuffer:
+    """All Opus packets of one sound stored in a single contiguous buffer"""
+
+    def __init__(self, packets):
+        self.data = b''.join(packets)
+        self.offsets = []
+        position = 0
+        for packet in packets:
+            self.offsets.append((position, position + len(packet)))
+            position += len(packet)
+
+    @property
+    def nbytes(self):
+        # Two 8-byte ints per packet for the offset table
+        return len(self.data) + 16 * len(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+class CachedOpusSource(discord.AudioSource):
+    """Audio source that serves packets as memoryview slices of a cached buffer"""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer.data)
+        self._offsets = buffer.offsets
+        self._index = 0
+
+    def read(self):
+        if self._index >= len(self._offsets):
+            return b''
+        start, end = self._offsets[self._index]
+        self._index += 1
+        return self._view[start:end]
+
+    def is_opus(self):
+        return True
+
+
+class AudioCache:
+    """Byte-budgeted LRU cache of encoded sounds"""
+
+    def __init__(self, max_bytes, pack=None):
+        self.max_bytes = max_bytes
+        # Optional SoundPack checked before the LRU
+        self.pack = pack
+        self.current_bytes = 0
+        self.pack_hits = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, sound_file):
+        """Return the cached buffer for a sound, loading it on a miss"""
+        with self._lock:
+            buffer = self._entries.get(key)
+            if buffer is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return buffer
+            self.misses += 1
+
+        if not is_cached(sound_file):
+            return None
+        buffer = PacketBuffer(load_packets(cache_path_for(sound_file)))
+        self.put(key, buffer)
+        return buffer
+
+    def warm(self, key, sound_file):
+        """Load a sound ahead of its first play without counting a hit or miss.
+        Returns True if it was read into the cache. Pack sounds are only hinted to
+        the OS page cache and, like cached or unencoded ones, return False."""
+        pack = self.pack
+        if pack is not None and pack.prefetch(key, sound_file):
+            return False
+        with self._lock:
+            if key in self._entries:
+                return False
+        if not is_cached(sound_file):
+            return False
+        self.put(key, PacketBuffer(load_packets(cache_path_for(sound_file))))
+        return True
+
+    def put(self, key, buffer):
+        """Store a buffer and evict least recently used entries over the budget"""
+        if buffer.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old.nbytes
+            self._entries[key] = buffer
+            self.current_bytes += buffer.nbytes
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """Drop one entry, e.g. when its file changed on disk"""
+        if self.pack is not None:
+            self.pack.invalidate(key)
+        with self._lock:
+            buffer = self._entries.pop(key, None)
+            if buffer is not None:
+                self.current_bytes -= buffer.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def source(self, key, sound_file):
+        """Return an AudioSource for a sound, falling back to ffmpeg if it is not encoded yet"""
+        pack = self.pack
+        if pack is not None:
+            source = pack.source(key, sound_file)
+            if source is not None:
+                with self._lock:
+                    self.pack_hits += 1
+                return source
+        try:
+            buffer = self.get(key, sound_file)
+        except Exception as e:
+            print(f"Failed to load cached sound {sound_file}: {e}")
+            buffer = None
+        if buffer is None:
+            return discord.FFmpegPCMAudio(sound_file)
+        return CachedOpusSource(buffer)
+
+    def stats(self):
+        with self._lock:
+            hits = self.hits + self.pack_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'pack_hits': self.pack_hits,
+                'pack_sounds': len(self.pack) if self.pack is not None else 0,
+                'pack_bytes': self.pack.nbytes if self.pack is not None else 0,
+                'hit_ratio': hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Audio pipeline microbenchmarks
+Measures the per-click cost of spawning ffmpeg for every play against the
+pre-encoded Opus cache and the in-memory audio cache, plus the cost of
+mixing N concurrent voices. Runs offline against the files in sounds/ and
+writes JSON so results can be compared between commits.
+
+Usage:
+    python benchmark_audio.py [--sounds N] [--voices 1,2,4,8] [--output results.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import time
+
+import discord
+import numpy as np
+
+from audio_cache import AudioCache
+from metrics import percentiles
+from mixer import FRAME_SAMPLES, MixerSource
+from opus_cache import OpusPacketSource, encode_sound
+from sound_catalog import SOUNDS_DIR, scan_sounds
+
+FRAME_DURATION = discord.opus.Encoder.FRAME_LENGTH / 1000
+
+
+def rss_bytes(pid='self'):
+    """Resident set size of a process from /proc, None where that is unavailable"""
+    try:
+        with open(f'/proc/{pid}/status') as fp:
+            for line in fp:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def cpu_seconds():
+    """CPU time of this process and of every child it has waited for"""
+    total = 0.0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+def summarize(samples, scale=1000.0):
+    """Mean and percentiles of a list of seconds, in milliseconds by default"""
+    if not samples:
+        return None
+    values = percentiles(samples, 50, 95)
+    return {
+        'n': len(samples),
+        'mean': sum(samples) / len(samples) * scale,
+        'p50': values[50] * scale,
+        'p95': values[95] * scale,
+        'max': max(samples) * scale,
+    }
+
+
+def drain(source):
+    """Read a source to the end, returns the number of frames"""
+    frames = 0
+    while source.read():
+        frames += 1
+    return frames
+
+
+def bench_ffmpeg(files):
+    """Current per-click path: one ffmpeg process decoding to PCM per play"""
+    spawn, first_frame, fps = [], [], []
+    for sound_file in files:
+        started = time.perf_counter()
+        source = discord.FFmpegPCMAudio(sound_file)
+        spawn.append(time.perf_counter() - started)
+        cpu_before = cpu_seconds()
+        frames = 1 if source.read() else 0
+        first_frame.append(time.perf_counter() - started)
+        frames += drain(source)
+        # cleanup() waits for ffmpeg, so its CPU time lands in RUSAGE_CHILDREN
+        source.cleanup()
+        cpu = cpu_seconds() - cpu_before
+        if cpu > 0:
+            fps.append(frames / cpu)
+    return {
+        'spawn_ms': summarize(spawn),
+        'first_frame_ms': summarize(first_frame),
+        'frames_per_cpu_second': sum(fps) / len(fps) if fps else None,
+    }
+
+
+def bench_cached(files):
+    """Pre-encoded Opus: cold loads from the on-disk cache, then warm hits in RAM"""
+    for sound_file in files:
+        encode_sound(sound_file)
+
+    cache = AudioCache(1 << 30)
+    results = {}
+    for phase in ('cold', 'warm'):
+        first_frame = []
+        frames = 0
+        cpu_before = cpu_seconds()
+        for sound_file in files:
+            started = time.perf_counter()
+            source = cache.source(sound_file, sound_file)
+            frames += 1 if source.read() else 0
+            first_frame.append(time.perf_counter() - started)
+            frames += drain(source)
+        cpu = cpu_seconds() - cpu_before
+        results[phase] = {
+            'first_frame_ms': summarize(first_frame),
+            'frames_per_cpu_second': frames / cpu if cpu > 0 else None,
+        }
+
+    # What the mixer pays when it has to decode a cached sound to mix it
+    if discord.opus.is_loaded():
+        decoder = discord.opus.Decoder()
+        frames = 0
+        cpu_before = cpu_seconds()
+        for sound_file in files:
+            source = cache.source(sound_file, sound_file)
+            packet = source.read()
+            while packet:
+                decoder.decode(bytes(packet))
+                frames += 1
+                packet = source.read()
+        cpu = cpu_seconds() - cpu_before
+        results['decode_frames_per_cpu_second'] = frames / cpu if cpu > 0 else None
+    results['cache_bytes'] = cache.stats()['bytes']
+    return results
+
+
+def bench_rss(files, streams):
+    """Memory held per concurrently active stream"""
+    results = {}
+
+    baseline = rss_bytes()
+    sources = [discord.FFmpegPCMAudio(files[i % len(files)]) for i in range(streams)]
+    try:
+        for source in sources:
+            source.read()
+        children = [rss_bytes(source._process.pid) for source in sources]
+        own = rss_bytes()
+        if baseline is not None and None not in children:
+            results['ffmpeg_bytes_per_stream'] = (sum(children) + own - baseline) / streams
+    finally:
+        for source in sources:
+            source.cleanup()
+
+    cache = AudioCache(1 << 30)
+    for sound_file in files:
+        encode_sound(sound_file)
+        cache.get(sound_file, sound_file)
+    baseline = rss_bytes()
+    sources = [cache.source(files[i % len(files)], files[i % len(files)]) for i in range(streams)]
+    for source in sources:
+        source.read()
+    if baseline is not None:
+        results['cached_bytes_per_stream'] = (rss_bytes() - baseline) / streams
+    results['streams'] = streams
+    return results
+
+
+def noise_frames(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(-8000, 8000, size=count * FRAME_SAMPLES, dtype=np.int16).tobytes()
+
+
+def time_mixer(make_source, voices, frames):
+    mixer = MixerSource(voices)
+    for i in range(voices):
+        mixer.add(make_source(i), name=f"voice-{i}")
+    timings = []
+    for _ in range(frames):
+        started = time.perf_counter()
+        if not mixer.read():
+            break
+        timings.append(time.perf_counter() - started)
+    mixer.clear()
+    stats = summarize(timings)
+    if stats:
+        stats['budget_fraction'] = stats['mean'] / 1000 / FRAME_DURATION
+    return stats
+
+
+def bench_mixing(voice_counts, frames=500):
+    """Cost of one mixed 20 ms frame at N voices, PCM inputs and (if libopus loads) Opus inputs"""
+    pcm = noise_frames(frames + 1)
+    results = {'pcm_frame_ms': {}}
+    for voices in voice_counts:
+        results['pcm_frame_ms'][str(voices)] = time_mixer(lambda i: discord.PCMAudio(io.BytesIO(pcm)), voices, frames)
+
+    if discord.opus.is_loaded():
+        encoder = discord.opus.Encoder()
+        frame_bytes = FRAME_SAMPLES * 2
+        packets = [encoder.encode(pcm[i:i + frame_bytes], discord.opus.Encoder.SAMPLES_PER_FRAME)
+                   for i in range(0, frames * frame_bytes, frame_bytes)]
+        results['opus_frame_ms'] = {}
+        for voices in voice_counts:
+            results['opus_frame_ms'][str(voices)] = time_mixer(lambda i: OpusPacketSource(packets), voices, frames)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'discord.py': discord.__version__,
+        'numpy': np.__version__,
+        'ffmpeg': shutil.which('ffmpeg'),
+        'opus_loaded': discord.opus.is_loaded(),
+    }
+
+
+def run_benchmarks(sounds_dir=SOUNDS_DIR, sounds=10, voice_counts=(1, 2, 4, 8), streams=8):
+    # Try to load libopus like the voice client would, the Opus benchmarks need it
+    try:
+        discord.opus._load_default()
+    except Exception:
+        pass
+
+    files = sorted(scan_sounds(sounds_dir))[:sounds]
+    report = {'environment': environment(), 'sounds': len(files), 'results': {}}
+    benchmarks = [
+        ('ffmpeg_pcm', lambda: bench_ffmpeg(files)),
+        ('opus_cache', lambda: bench_cached(files)),
+        ('rss', lambda: bench_rss(files, streams)),
+        ('mixing', lambda: bench_mixing(voice_counts)),
+    ]
+    for name, bench in benchmarks:
+        if not files and name != 'mixing':
+            report['results'][name] = {'error': f"no sounds found in {sounds_dir}"}
+            continue
+        print(f"Running {name}...")
+        try:
+            report['results'][name] = bench()
+        except Exception as e:
+            print(f"Benchmark {name} failed: {e}")
+            report['results'][name] = {'error': str(e)}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the audio pipeline against the local sound library")
+    parser.add_argument('--sounds-dir', default=SOUNDS_DIR)
+    parser.add_argument('--sounds', type=int, default=10, help="Number of sound files to sample")
+    parser.add_argument('--voices', default='1,2,4,8', help="Comma separated voice counts for the mixing benchmark")
+    parser.add_argument('--streams', type=int, default=8, help="Concurrent streams for the memory benchmark")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sounds_dir, args.sounds,
+                            [int(v) for v in args.voices.split(',') if v.strip()], args.streams)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            fp.write(text + '\n')
+        print(f"Results written to {args.output}")
+    else:
+        print(text)
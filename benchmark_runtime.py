@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Gateway profile memory and CPU benchmark
+Feeds the same synthetic gateway traffic for N guilds into a bot built with
+the default and the lean runtime profile, each in a fresh process, and
+reports resident memory and the CPU spent processing events. Events a
+profile has no intent for are dropped before parsing, as Discord would
+never send them. Runs offline and prints JSON.
+
+Usage:
+    python benchmark_runtime.py [--guilds N] [--events N] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+import discord
+from discord.ext import commands
+
+from benchmark_audio import environment, rss_bytes
+from runtime_profile import bot_options
+
+BOT_ID = 1
+MEMBERS_PER_GUILD = 20
+
+# Gateway event -> the intent Discord requires before sending it
+EVENT_INTENTS = {
+    'MESSAGE_CREATE': 'guild_messages',
+    'TYPING_START': 'guild_typing',
+    'MESSAGE_REACTION_ADD': 'guild_reactions',
+    'VOICE_STATE_UPDATE': 'voice_states',
+}
+# Rough share of each event in a busy server's traffic
+EVENT_WEIGHTS = {
+    'MESSAGE_CREATE': 50,
+    'TYPING_START': 30,
+    'MESSAGE_REACTION_ADD': 15,
+    'VOICE_STATE_UPDATE': 5,
+}
+
+
+def snowflake(n):
+    # Ids in the recent past so message timestamps look current
+    return ((int(time.time() * 1000) - 1420070400000) << 22) + n
+
+
+def user_payload(user_id):
+    return {'id': str(user_id), 'username': f"user{user_id}", 'discriminator': '0',
+            'global_name': None, 'avatar': None}
+
+
+def member_payload(user_id):
+    return {'user': user_payload(user_id), 'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00',
+            'deaf': False, 'mute': False, 'flags': 0}
+
+
+def guild_payload(guild_id):
+    text_id, voice_id = guild_id * 10 + 1, guild_id * 10 + 2
+    # Without the members intent GUILD_CREATE carries the bot and the members in voice
+    in_voice = [guild_id * 1000 + i for i in range(3)]
+    return {
+        'id': str(guild_id), 'name': f"guild-{guild_id}", 'owner_id': str(guild_id * 1000),
+        'member_count': MEMBERS_PER_GUILD, 'large': False, 'unavailable': False,
+        'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0,
+                   'color': 0, 'hoist': False, 'managed': False, 'mentionable': False}],
+        'channels': [
+            {'id': str(text_id), 'type': 0, 'name': 'general', 'position': 0, 'permission_overwrites': []},
+            {'id': str(voice_id), 'type': 2, 'name': 'voice', 'position': 1, 'permission_overwrites': [],
+             'bitrate': 64000, 'user_limit': 0},
+        ],
+        'members': [member_payload(BOT_ID)] + [member_payload(user_id) for user_id in in_voice],
+        'voice_states': [{'user_id': str(user_id), 'channel_id': str(voice_id), 'session_id': 'x',
+                          'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': False,
+                          'self_video': False, 'suppress': False} for user_id in in_voice],
+        'presences': [], 'emojis': [], 'stickers': [], 'features': [], 'threads': [],
+        'stage_instances': [], 'guild_scheduled_events': [],
+    }
+
+
+def event_payload(kind, guild_id, n, rng):
+    user_id = guild_id * 1000 + rng.randrange(MEMBERS_PER_GUILD)
+    text_id, voice_id = guild_id * 10 + 1, guild_id * 10 + 2
+    if kind == 'MESSAGE_CREATE':
+        return {'id': str(snowflake(n)), 'channel_id': str(text_id), 'guild_id': str(guild_id),
+                'author': user_payload(user_id), 'member': member_payload(user_id),
+                'content': 'lol ' * rng.randrange(1, 20), 'timestamp': '2024-01-01T00:00:00+00:00',
+                'edited_timestamp': None, 'tts': False, 'mention_everyone': False, 'mentions': [],
+                'mention_roles': [], 'attachments': [], 'embeds': [], 'pinned': False, 'type': 0}
+    if kind == 'TYPING_START':
+        return {'channel_id': str(text_id), 'guild_id': str(guild_id), 'user_id': str(user_id),
+                'timestamp': int(time.time()), 'member': member_payload(user_id)}
+    if kind == 'MESSAGE_REACTION_ADD':
+        return {'user_id': str(user_id), 'channel_id': str(text_id), 'guild_id': str(guild_id),
+                'message_id': str(snowflake(max(0, n - 1))), 'emoji': {'id': None, 'name': '😂'},
+                'member': member_payload(user_id), 'type': 0, 'burst': False}
+    return {'guild_id': str(guild_id), 'user_id': str(user_id), 'session_id': 'x',
+            'channel_id': str(voice_id) if rng.random() < 0.5 else None, 'deaf': False, 'mute': False,
+            'self_deaf': False, 'self_mute': False, 'self_video': False, 'suppress': False,
+            'member': member_payload(user_id)}
+
+
+async def run_profile(lean, guilds, events, seed):
+    """Measure one profile in this process"""
+    rng = random.Random(seed)
+    rss_start = rss_bytes()
+    bot = commands.Bot(command_prefix="/", **bot_options(lean))
+    # What logging in does: bind to this loop and set our own user
+    await bot._async_setup_hook()
+    state = bot._connection
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_ID))
+
+    cpu_started = time.process_time()
+    for guild_id in range(1, guilds + 1):
+        state.parse_guild_create(guild_payload(guild_id))
+    guild_cpu = time.process_time() - cpu_started
+    rss_guilds = rss_bytes()
+
+    kinds = list(EVENT_WEIGHTS)
+    weights = [EVENT_WEIGHTS[kind] for kind in kinds]
+    delivered = 0
+    event_cpu = 0.0
+    for n in range(events):
+        kind = rng.choices(kinds, weights)[0]
+        guild_id = rng.randrange(1, guilds + 1)
+        # Discord filters by intent before sending, so build nothing for dropped events
+        if not getattr(bot.intents, EVENT_INTENTS[kind]):
+            continue
+        payload = event_payload(kind, guild_id, n, rng)
+        # Only parsing and handlers count, not building the synthetic payload
+        cpu_started = time.process_time()
+        getattr(state, f"parse_{kind.lower()}")(payload)
+        delivered += 1
+        if delivered % 1000 == 0:
+            # Let dispatched handlers (prefix command processing) run
+            await asyncio.sleep(0)
+        event_cpu += time.process_time() - cpu_started
+    cpu_started = time.process_time()
+    await asyncio.sleep(0)
+    event_cpu += time.process_time() - cpu_started
+    rss_end = rss_bytes()
+
+    return {
+        'profile': 'lean' if lean else 'default',
+        'intents': bot.intents.value,
+        'events_delivered': delivered,
+        'guild_create_cpu_seconds': guild_cpu,
+        'event_cpu_seconds': event_cpu,
+        'event_cpu_us_per_event_sent': event_cpu / events * 1e6 if events else None,
+        'cached_messages': len(state._messages) if state._messages is not None else 0,
+        'rss_start': rss_start,
+        'rss_after_guilds': rss_guilds,
+        'rss_end': rss_end,
+        'rss_growth': rss_end - rss_start if rss_start is not None and rss_end is not None else None,
+    }
+
+
+def run_in_subprocess(profile, args):
+    """Each profile runs in a fresh interpreter so RSS is not shared between them"""
+    result = subprocess.run(
+        [sys.executable, __file__, '--profile', profile, '--guilds', str(args.guilds),
+         '--events', str(args.events), '--seed', str(args.seed)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare memory and event CPU of the default and lean bot profiles")
+    parser.add_argument('--guilds', type=int, default=1000, help="Simulated guild count")
+    parser.add_argument('--events', type=int, default=100000, help="Gateway events generated across all guilds")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--profile', choices=('default', 'lean'), help=argparse.SUPPRESS)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    if args.profile:
+        # Child process: measure a single profile
+        print(json.dumps(asyncio.run(run_profile(args.profile == 'lean', args.guilds, args.events, args.seed))))
+        raise SystemExit(0)
+
+    report = {'environment': environment(), 'guilds': args.guilds, 'events': args.events,
+              'results': {profile: run_in_subprocess(profile, args) for profile in ('default', 'lean')}}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            fp.write(text + '\n')
+        print(f"Results written to {args.output}")
+    else:
+        print(text)
@@ -0,0 +1,140 @@
+"""
+Audio frame pacing instrumentation
+Wraps the AudioSource handed to the voice client and times every 20 ms frame
+read against the player's ideal schedule. Slow reads point at decode or disk,
+frames that start late with fast reads point at the host or event loop
+starving the player thread.
+"""
+
+import threading
+import time
+from collections import deque
+
+import discord
+
+from metrics import Histogram, percentiles
+
+FRAME_DURATION = discord.opus.Encoder.FRAME_LENGTH / 1000
+
+# A read taking more than half a frame leaves little room for encode and send
+SLOW_READ_THRESHOLD = FRAME_DURATION / 2
+# A frame starting this far behind schedule is late, a full frame behind is an underrun
+LATE_FRAME_THRESHOLD = FRAME_DURATION / 2
+UNDERRUN_THRESHOLD = FRAME_DURATION
+
+frame_read_seconds = Histogram(
+    'memer_frame_read_seconds', "Time to produce one 20 ms audio frame",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1))
+frame_lateness_seconds = Histogram(
+    'memer_frame_lateness_seconds', "How far behind the ideal 20 ms schedule a frame read started",
+    buckets=(0.001, 0.005, 0.01, 0.02, 0.04, 0.1, 0.25, 1.0))
+
+
+class PacingStats:
+    """Frame pacing counters over some span of playback"""
+
+    def __init__(self):
+        self.frames = 0
+        self.read_time = 0.0
+        self.max_read = 0.0
+        self.slow_reads = 0
+        self.late_frames = 0
+        self.underruns = 0
+        self.drift = 0.0
+        self.max_drift = 0.0
+
+    def add(self, read_time, lateness):
+        self.frames += 1
+        self.read_time += read_time
+        self.max_read = max(self.max_read, read_time)
+        if read_time > SLOW_READ_THRESHOLD:
+            self.slow_reads += 1
+        if lateness > LATE_FRAME_THRESHOLD:
+            self.late_frames += 1
+        if lateness > UNDERRUN_THRESHOLD:
+            self.underruns += 1
+        self.drift = lateness
+        self.max_drift = max(self.max_drift, lateness)
+
+    def summary(self):
+        if not self.frames:
+            return "no frames"
+        return (f"{self.frames} frames, read avg {self.read_time / self.frames * 1000:.2f}ms "
+                f"max {self.max_read * 1000:.1f}ms, {self.slow_reads} slow reads, "
+                f"{self.late_frames} late, {self.underruns} underruns, "
+                f"drift {self.drift * 1000:.0f}ms (max {self.max_drift * 1000:.0f}ms)")
+
+
+class FramePacing:
+    """Pacing totals for one guild's playback, plus open per-sound windows"""
+
+    def __init__(self, recent=3000):
+        self.total = PacingStats()
+        # Stats of the most recent vc.play() run
+        self.last_run = None
+        self._windows = []
+        self._recent_reads = deque(maxlen=recent)
+        self._lock = threading.Lock()
+
+    def start_run(self):
+        with self._lock:
+            self.last_run = PacingStats()
+
+    def open_window(self):
+        """Start collecting stats for one sound, pass the result to close_window() when it ends"""
+        stats = PacingStats()
+        with self._lock:
+            self._windows.append(stats)
+        return stats
+
+    def close_window(self, stats):
+        with self._lock:
+            if stats in self._windows:
+                self._windows.remove(stats)
+        return stats
+
+    def record(self, read_time, lateness):
+        with self._lock:
+            self.total.add(read_time, lateness)
+            if self.last_run is not None:
+                self.last_run.add(read_time, lateness)
+            for window in self._windows:
+                window.add(read_time, lateness)
+            self._recent_reads.append(read_time)
+        frame_read_seconds.observe(read_time)
+        frame_lateness_seconds.observe(lateness)
+
+    def read_percentiles(self, *points):
+        """Percentiles of recent frame read times"""
+        with self._lock:
+            samples = list(self._recent_reads)
+        return percentiles(samples, *points)
+
+
+class PacedSource(discord.AudioSource):
+    """Times every read of the wrapped source against the player's 20 ms schedule"""
+
+    def __init__(self, source, pacing):
+        self.source = source
+        self.pacing = pacing
+        self._start = None
+        self._frames = 0
+
+    def read(self):
+        now = time.perf_counter()
+        if self._start is None:
+            # The player starts its clock right before the first read
+            self._start = now
+            self.pacing.start_run()
+        lateness = max(0.0, now - (self._start + self._frames * FRAME_DURATION))
+        data = self.source.read()
+        self._frames += 1
+        if data:
+            self.pacing.record(time.perf_counter() - now, lateness)
+        return data
+
+    def is_opus(self):
+        return self.source.is_opus()
+
+    def cleanup(self):
+        self.source.cleanup()
@@ -0,0 +1,61 @@
+"""
+Per-guild playback state
+Each guild gets its own mixer, queue, voice client and soundboard message
+so activity in one guild never blocks or overwrites another.
+"""
+
+from collections import deque
+
+from mixer import MixerSource
+from play_queue import PlayQueue
+from settings import MIXER_MAX_VOICES, PLAY_QUEUE_MAX_DEPTH, PLAY_QUEUE_MAX_PER_USER
+
+
+class GuildState:
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.mixer = MixerSource(MIXER_MAX_VOICES)
+        self.queue = PlayQueue(PLAY_QUEUE_MAX_DEPTH, PLAY_QUEUE_MAX_PER_USER)
+        self.voice_client = None
+        self.soundboard_message_id = None
+        # channel_id -> ids of the bot's recent messages there, so /memer can
+        # clean up without scanning the channel history
+        self.bot_messages = {}
+        # Channels whose history was already swept once since startup
+        self.swept_channels = set()
+
+    @property
+    def is_playing(self):
+        return self.mixer.active_voices > 0
+
+    def track_message(self, channel_id, message_id):
+        messages = self.bot_messages.get(channel_id)
+        if messages is None:
+            messages = self.bot_messages[channel_id] = deque(maxlen=BOT_MESSAGES_PER_CHANNEL)
+        messages.append(message_id)
+
+    def take_messages(self, channel_id):
+        """Return and forget the tracked bot messages of a channel"""
+        # An id can be tracked twice (on_message and the sender), bulk deletes reject duplicates
+        return list(dict.fromkeys(self.bot_messages.pop(channel_id, ())))
+
+    def remove_message(self, message_id):
+        if self.soundboard_message_id == message_id:
+            self.soundboard_message_id = None
+        for messages in self.bot_messages.values():
+            if message_id in messages:
+                messages.remove(message_id)
+
+
+# Same reach as the old 100 message history scan
+BOT_MESSAGES_PER_CHANNEL = 100
+
+guild_states = {}
+
+
+def get_guild_state(guild_id):
+    """Return the state for a guild, creating it on first use"""
+    state = guild_states.get(guild_id)
+    if state is None:
+        state = guild_states[guild_id] = GuildState(guild_id)
+    return state
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Offline load harness for the soundboard
+Stands in for the Discord gateway, interactions and voice connections so the
+real SoundButton and navigation callbacks and the voice connect path in
+memer.py can be driven with N guilds and M clicks per second, without any
+network access. Reports throughput, ack latency percentiles, outcome and
+error rates and memory growth.
+
+Usage:
+    python load_harness.py [--guilds N] [--rate M] [--duration SECONDS] [--output report.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import discord
+
+from audio_cache import PacketBuffer
+from benchmark_audio import rss_bytes, summarize
+
+BOT_USER_ID = 1
+FAKE_ENDPOINT = 'fake-voice.local:443'
+# An Opus frame of silence, what discord.py sends after a sound ends
+SILENCE_PACKET = b'\xf8\xff\xfe'
+FRAME_DURATION = discord.opus.Encoder.FRAME_LENGTH / 1000
+
+
+class FakeNetwork:
+    """Simulated Discord API and voice server timings and failure rates"""
+
+    def __init__(self, api_latency, connect_latency, connect_failure_rate, rng):
+        self.api_latency = api_latency
+        self.connect_latency = connect_latency
+        self.connect_failure_rate = connect_failure_rate
+        self.rng = rng
+
+    async def api_call(self):
+        # Jitter the round trip by up to +/-50%
+        await asyncio.sleep(self.api_latency * self.rng.uniform(0.5, 1.5))
+
+
+class FakeMember:
+    def __init__(self, member_id, guild, channel=None):
+        self.id = member_id
+        self.guild = guild
+        self.voice = SimpleNamespace(channel=channel) if channel else None
+        self.bot = member_id == BOT_USER_ID
+        self.guild_permissions = discord.Permissions.none()
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakePlayer(threading.Thread):
+    """Reads the source every 20 ms on its own thread, like discord.py's AudioPlayer"""
+
+    def __init__(self, source, after):
+        super().__init__(daemon=True)
+        self.source = source
+        self.after = after
+        self._stop_event = threading.Event()
+
+    def run(self):
+        error = None
+        start = time.perf_counter()
+        frames = 0
+        try:
+            while not self._stop_event.is_set():
+                if not self.source.read():
+                    break
+                frames += 1
+                delay = start + frames * FRAME_DURATION - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        except Exception as e:
+            error = e
+        self.source.cleanup()
+        if self.after is not None:
+            self.after(error)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class FakeVoiceClient:
+    def __init__(self, harness, guild, channel):
+        self.harness = harness
+        self.guild = guild
+        self.channel = channel
+        self.endpoint = FAKE_ENDPOINT
+        self.latency = harness.network.api_latency
+        self._connected = True
+        self._player = None
+
+    def is_connected(self):
+        return self._connected
+
+    def is_playing(self):
+        return self._player is not None and self._player.is_alive()
+
+    def play(self, source, *, after=None):
+        if self.is_playing():
+            raise discord.ClientException('Already playing audio.')
+        self._player = FakePlayer(source, after)
+        self.harness.players.append(self._player)
+        self._player.start()
+
+    def stop(self):
+        if self._player is not None:
+            self._player.stop()
+
+    async def move_to(self, channel):
+        await self.harness.network.api_call()
+        self.harness.set_bot_channel(self.guild, channel)
+        self.channel = channel
+
+    async def disconnect(self, *, force=False):
+        self.stop()
+        self._connected = False
+        if self.guild.voice_client is self:
+            self.guild.voice_client = None
+        self.harness.set_bot_channel(self.guild, None)
+
+
+class FakeVoiceChannel:
+    def __init__(self, harness, guild, channel_id):
+        self.harness = harness
+        self.guild = guild
+        self.id = channel_id
+        self.name = f"voice-{channel_id}"
+
+    async def connect(self, *, timeout=60.0, **kwargs):
+        network = self.harness.network
+        self.harness.connect_attempts += 1
+        await asyncio.wait_for(
+            asyncio.sleep(network.connect_latency * network.rng.uniform(0.5, 1.5)), timeout)
+        if network.rng.random() < network.connect_failure_rate:
+            # Half the failures are the 4006 session errors seen in production, half timeouts
+            self.guild.voice_client = FakeVoiceClient(self.harness, self.guild, self)
+            self.guild.voice_client._connected = False
+            if network.rng.random() < 0.5:
+                raise discord.ConnectionClosed(SimpleNamespace(close_code=4006), shard_id=None, code=4006)
+            raise asyncio.TimeoutError()
+        vc = FakeVoiceClient(self.harness, self.guild, self)
+        self.guild.voice_client = vc
+        self.harness.set_bot_channel(self.guild, self)
+        return vc
+
+
+class FakeGuild:
+    def __init__(self, harness, guild_id, members):
+        self.id = guild_id
+        self.name = f"guild-{guild_id}"
+        self.voice_client = None
+        self.me = FakeMember(BOT_USER_ID, self)
+        self.voice_channel = FakeVoiceChannel(harness, self, guild_id * 100)
+        # Most members sit in the voice channel, a few click without being in one
+        self.members = [FakeMember(guild_id * 1000 + i, self, self.voice_channel) for i in range(members)]
+        self.members.append(FakeMember(guild_id * 1000 + members, self))
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _respond(self, content=None):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        await self._interaction.network.api_call()
+        self._done = True
+        self._interaction.acked_at = time.perf_counter()
+        if content is not None:
+            self._interaction.content = content
+
+    async def defer(self, *, ephemeral=False, thinking=False):
+        await self._respond()
+
+    async def send_message(self, content=None, *, ephemeral=False, **kwargs):
+        await self._respond(content)
+
+    async def edit_message(self, *, content=None, view=None, **kwargs):
+        await self._respond(content)
+        self._interaction.view = view
+
+
+class FakeInteraction:
+    def __init__(self, network, guild, user):
+        self.network = network
+        self.guild = guild
+        self.user = user
+        # Component clicks carry the soundboard message, one board per guild
+        self.message = discord.Object(id=guild.id)
+        self.created_at = discord.utils.utcnow()
+        self.started = time.perf_counter()
+        self.acked_at = None
+        self.content = None
+        self.view = None
+        self.response = FakeResponse(self)
+
+    async def edit_original_response(self, *, content=None, **kwargs):
+        await self.network.api_call()
+        self.content = content
+
+
+class LoadHarness:
+    def __init__(self, memer, guilds, members, network, rng, nav_ratio):
+        self.memer = memer
+        self.network = network
+        self.rng = rng
+        self.nav_ratio = nav_ratio
+        self.guilds = [FakeGuild(self, guild_id, members) for guild_id in range(1, guilds + 1)]
+        self.connect_attempts = 0
+        self.players = []
+        self.ack_latency = []
+        self.completion_latency = []
+        self.outcomes = Counter()
+        self.errors = Counter()
+        self.memory_samples = []
+
+    def set_bot_channel(self, guild, channel):
+        """Update the bot's voice state and dispatch voice_state_update like the gateway would"""
+        before = guild.me.voice
+        guild.me.voice = SimpleNamespace(channel=channel) if channel else None
+        self.memer.bot.dispatch('voice_state_update', guild.me, before or SimpleNamespace(channel=None),
+                                guild.me.voice or SimpleNamespace(channel=None))
+
+    def pick_item(self):
+        """Pick a rendered button the way a user would, from a random soundboard page"""
+        memer = self.memer
+        category = self.rng.choice(memer.sorted_categories)
+        page = self.rng.randrange(max(1, memer.total_pages_for(category)))
+        _, _, _, view = memer.get_soundboard_view(category, page)
+        wanted = memer.SoundboardNavButton if self.rng.random() < self.nav_ratio else memer.SoundButton
+        candidates = [child for child in view.children
+                      if isinstance(child, wanted) and not child.item.disabled]
+        return self.rng.choice(candidates) if candidates else None
+
+    async def click(self, guild):
+        """One simulated click, routed by custom_id through the real DynamicItem classes"""
+        rendered = self.pick_item()
+        if rendered is None:
+            return
+        interaction = FakeInteraction(self.network, guild, self.rng.choice(guild.members))
+        cls = type(rendered)
+        match = cls.__discord_ui_compiled_template__.fullmatch(rendered.custom_id)
+        try:
+            item = await cls.from_custom_id(interaction, rendered.item, match)
+            await item.callback(interaction)
+        except Exception as e:
+            self.errors[type(e).__name__] += 1
+            self.outcomes['exception'] += 1
+            return
+        finally:
+            if interaction.acked_at is not None:
+                self.ack_latency.append(interaction.acked_at - interaction.started)
+            self.completion_latency.append(time.perf_counter() - interaction.started)
+
+        if isinstance(rendered, self.memer.SoundboardNavButton):
+            self.outcomes['navigated' if interaction.view is not None else 'nav_failed'] += 1
+        elif interaction.acked_at is None:
+            self.outcomes['not_acknowledged'] += 1
+        elif not interaction.content:
+            self.outcomes['no_reply'] += 1
+        elif interaction.content.startswith('🔊'):
+            self.outcomes['played'] += 1
+        elif interaction.content.startswith('⏳'):
+            self.outcomes['queued'] += 1
+        elif interaction.content.startswith('❌ You must be in a voice channel'):
+            # Expected rejection, the member clicking was not in voice
+            self.outcomes['not_in_voice'] += 1
+        else:
+            self.outcomes['error'] += 1
+            # Group by the message without the variable sound name or position
+            self.errors[interaction.content.split('`')[0].split(':')[0].strip()] += 1
+
+    async def sample_memory(self, interval=0.5):
+        while True:
+            rss = rss_bytes()
+            if rss is not None:
+                self.memory_samples.append(rss)
+            await asyncio.sleep(interval)
+
+    async def run(self, rate, duration):
+        sampler = asyncio.create_task(self.sample_memory())
+        clicks = []
+        started = time.perf_counter()
+        # Poisson arrivals at the requested total rate, spread over random guilds
+        next_click = started
+        while next_click - started < duration:
+            await asyncio.sleep(max(0.0, next_click - time.perf_counter()))
+            clicks.append(asyncio.create_task(self.click(self.rng.choice(self.guilds))))
+            next_click += self.rng.expovariate(rate)
+        if clicks:
+            await asyncio.wait(clicks)
+        elapsed = time.perf_counter() - started
+
+        for guild in self.guilds:
+            await self.memer.voice_sessions.close(guild)
+        # Let the players and the voice_state_update handlers finish before reporting
+        for player in self.players:
+            await asyncio.to_thread(player.join)
+        await asyncio.sleep(0.1)
+        sampler.cancel()
+        return len(clicks), elapsed
+
+
+def prefill_audio_cache(memer, seconds):
+    """Warm the real audio cache with silent Opus buffers so no ffmpeg is needed"""
+    buffer = PacketBuffer([SILENCE_PACKET] * max(1, int(seconds / FRAME_DURATION)))
+    for key in memer.sound_map:
+        memer.audio_cache.put(key, buffer)
+
+
+async def run_harness(args):
+    rng = random.Random(args.seed)
+    quiet = io.StringIO()
+    # memer prints on every click, keep that out of the report
+    with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(quiet):
+        import memer
+
+        # What logging in does: bind the bot to this loop and set our own user
+        await memer.bot._async_setup_hook()
+        memer.bot._connection.user = SimpleNamespace(id=BOT_USER_ID, name='memer-harness')
+        if not memer.sound_map:
+            raise SystemExit("No sounds found, the harness needs a sounds/ library to click")
+
+        if not args.cold:
+            prefill_audio_cache(memer, args.sound_seconds)
+        memer.prewarm_soundboard_views()
+
+        network = FakeNetwork(args.api_latency / 1000, args.connect_latency / 1000,
+                              args.connect_failure_rate, rng)
+        harness = LoadHarness(memer, args.guilds, args.members, network, rng, args.nav_ratio)
+        rss_start = rss_bytes()
+        total, elapsed = await harness.run(args.rate, args.duration)
+        rss_end = rss_bytes()
+
+    failed = harness.outcomes['error'] + harness.outcomes['exception'] + harness.outcomes['not_acknowledged']
+    return {
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        'opus_loaded': discord.opus.is_loaded(),
+        'clicks': total,
+        'elapsed_seconds': elapsed,
+        'throughput_per_second': total / elapsed if elapsed else None,
+        'ack_ms': summarize(harness.ack_latency),
+        'completion_ms': summarize(harness.completion_latency),
+        'outcomes': dict(harness.outcomes),
+        'error_rate': failed / total if total else 0.0,
+        'errors': dict(harness.errors),
+        'voice_connect_attempts': harness.connect_attempts,
+        'memory': {
+            'rss_start': rss_start,
+            'rss_end': rss_end,
+            'rss_peak': max(harness.memory_samples, default=None),
+            'rss_growth': rss_end - rss_start if rss_start is not None and rss_end is not None else None,
+            'guild_states': len(memer.guild_states),
+            'audio_cache_bytes': memer.audio_cache.current_bytes,
+        },
+    }
+
+
+def print_report(report):
+    ack = report['ack_ms'] or {}
+    memory = report['memory']
+    print(f"🧪 {report['clicks']} clicks in {report['elapsed_seconds']:.1f}s "
+          f"({report['throughput_per_second']:.1f}/s) across {report['config']['guilds']} guild(s)")
+    if ack:
+        print(f"⏱️ Ack latency: p50 {ack['p50']:.1f}ms, p95 {ack['p95']:.1f}ms, max {ack['max']:.1f}ms")
+    print(f"📊 Outcomes: {report['outcomes']}")
+    print(f"❌ Error rate: {report['error_rate']:.1%} {report['errors'] or ''}")
+    if memory['rss_growth'] is not None:
+        print(f"💾 RSS {memory['rss_start'] / 1024 / 1024:.1f} → {memory['rss_end'] / 1024 / 1024:.1f} MB "
+              f"(peak {memory['rss_peak'] / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive memer.py's click and connect paths against a fake Discord")
+    parser.add_argument('--guilds', type=int, default=10)
+    parser.add_argument('--members', type=int, default=5, help="Members in voice per guild")
+    parser.add_argument('--rate', type=float, default=20, help="Clicks per second across all guilds")
+    parser.add_argument('--duration', type=float, default=10, help="Seconds to generate clicks for")
+    parser.add_argument('--nav-ratio', type=float, default=0.2, help="Fraction of clicks on navigation buttons")
+    parser.add_argument('--api-latency', type=float, default=40, help="Simulated Discord API round trip in ms")
+    parser.add_argument('--connect-latency', type=float, default=300, help="Simulated voice connect time in ms")
+    parser.add_argument('--connect-failure-rate', type=float, default=0.05)
+    parser.add_argument('--sound-seconds', type=float, default=2, help="Length of the silent sounds in the warm cache")
+    parser.add_argument('--cold', action='store_true', help="Don't prefill the audio cache (needs ffmpeg)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verbose', action='store_true', help="Show the bot's own output")
+    parser.add_argument('--output', help="Also write the report as JSON here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_harness(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as fp:
+            json.dump(report, fp, indent=2)
+        print(f"Report written to {args.output}")
@@ -1,9 +1,30 @@
 import discord
-from discord.ext import commands
-from discord.ui import Button, View
+from discord.ext import commands, tasks
+from discord.ui import Button, DynamicItem, View
 import os
-from pws import discord_token
+from sound_catalog import SoundCatalog
+from opus_cache import build_cache
+from audio_cache import AudioCache, CachedOpusSource
+from sound_pack import PackedOpusSource, load_pack, refresh_pack, update_sound_assets
+from voice_sessions import VoiceSessionManager
+from guild_state import get_guild_state, guild_states
+from play_queue import QueuedSound, QueueError
+from metrics import (click_to_ack, click_to_first_audio, voice_connect_seconds, source_start_seconds,
+                     CallbackCounter, Counter, Gauge, monitor_event_loop_lag, start_metrics_server)
+from voice_health import VoiceHealthTracker
+from voice_prewarm import VoicePrewarmPolicy
+from page_prefetch import PagePrefetcher
+from network_probe import probe_hosts
+from runtime_profile import bot_options
+from settings import (AUDIO_CACHE_MAX_MB, VOICE_IDLE_TIMEOUT, PLAY_QUEUE_MODERATOR_PRIORITY, SOUND_RELOAD_INTERVAL,
+                      VOICE_CONNECT_DEADLINE, VOICE_CONNECT_ATTEMPT_TIMEOUT, VOICE_BACKOFF_BASE, VOICE_BACKOFF_CAP,
+                      VOICE_BREAKER_FAILURES, VOICE_BREAKER_COOLDOWN, VOICE_BREAKER_MAX_COOLDOWN,
+                      VOICE_PROBE_HOSTS, VOICE_PROBE_SAMPLES, VOICE_PROBE_TIMEOUT, METRICS_PORT, METRICS_HOST,
+                      SHARD_COUNT, SHARD_IDS, SHARED_ASSETS, LEAN_RUNTIME, SYNC_APP_COMMANDS,
+                      VOICE_PREWARM, VOICE_PREWARM_RECENT_USE, VOICE_PREWARM_IDLE, VOICE_PREWARM_MAX_CONNECTIONS,
+                      VOICE_PREWARM_MAX_PER_GUILD_HOURLY, PREFETCH_WORKERS, PREFETCH_MAX_PENDING)
 import asyncio
+import datetime
 import time
 import logging
 import random
@@ -12,54 +33,24 @@ import random
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('discord')
 
-intents = discord.Intents.default()
-intents.message_content = True
-intents.voice_states = True
-
-bot = commands.Bot(command_prefix="/", intents=intents)
-
-# --- Updated Sound Data Loading ---
-sound_map = {}
-categories = {}
-
-# Iterate through items in the 'sounds' directory
-for item_name in os.listdir('sounds'):
-    item_path = os.path.join('sounds', item_name)
-    
-    # Check if the item is a directory (this will be our category)
-    if os.path.isdir(item_path):
-        category_name = item_name  # The directory name is the category
-        
-        if category_name not in categories:
-            categories[category_name] = []
-            
-        # List files within this category directory
-        for sound_filename in os.listdir(item_path):
-            # You might want to skip system files like 'Zone.Identifier' if they appear
-            if 'Zone' in sound_filename or sound_filename.startswith('.'):
-                continue
-            
-            sound_name_base, sound_ext = os.path.splitext(sound_filename)
-            
-            # Ensure it's a common audio file type (optional, but good practice)
-            if sound_ext.lower() not in ['.mp3', '.wav', '.ogg', '.m4a']: # Add more if needed
-                continue
-
-            categories[category_name].append(sound_name_base)
-            
-            # The key for sound_map should still uniquely identify the sound.
-            # Using "category-sound_name_base" format maintains consistency 
-            # with how SoundButton and SoundboardView expect to look up sounds.
-            full_name_key = f"{category_name}-{sound_name_base}"
-            sound_map[full_name_key] = os.path.join(item_path, sound_filename)
-            
-# Sort categories alphabetically
-sorted_categories = sorted(categories.keys())
-
-# Sort sounds within each category
-for category in sorted_categories:
-    categories[category].sort()
-# --- End of Updated Sound Data Loading ---
+# The lean profile drops message events and caches, commands are then used as slash commands
+options = bot_options(LEAN_RUNTIME)
+
+if SHARD_COUNT:
+    # Sharded mode: run the shards in SHARD_IDS (or all of them) over one event loop per process
+    bot = commands.AutoShardedBot(command_prefix="/", **options,
+                                  shard_count=SHARD_COUNT if SHARD_COUNT > 0 else None,
+                                  shard_ids=SHARD_IDS or None)
+else:
+    bot = commands.Bot(command_prefix="/", **options)
+
+# --- Sound Data Loading ---
+# The shared catalog only reprobes files that changed since the last start
+catalog = SoundCatalog(read_only=bool(SHARED_ASSETS)).load()
+sound_map = catalog.sound_map
+categories = catalog.categories
+sorted_categories = catalog.sorted_categories
+# --- End of Sound Data Loading ---
 
 # Create a mapping of categories to styles
 available_styles = [
@@ -73,461 +64,615 @@ category_styles = {}
 for i, category in enumerate(sorted_categories):
     category_styles[category] = available_styles[i % len(available_styles)]
 
-# Store the persistent message ID and view
-persistent_message_id = None
-persistent_view = None
-
-# Track if a sound is currently playing
-is_playing = False
-
-# Track voice client connection attempts
-connection_attempts = {}
-
-# Connection state tracking
-voice_connection_issues = {}
-
-# Track successful voice servers
-working_voice_servers = set()
+# In-memory cache of encoded sounds, keyed by sound_map entry, in front of the mapped sound pack
+audio_cache = AudioCache(AUDIO_CACHE_MAX_MB * 1024 * 1024, pack=load_pack())
+
+# Scrape-time gauges for state that already lives elsewhere
+Gauge('memer_play_queue_depth', "Sounds waiting in play queues across all guilds",
+      lambda: sum(len(state.queue) for state in guild_states.values()))
+Gauge('memer_active_voices', "Sounds currently being mixed across all guilds",
+      lambda: sum(state.mixer.active_voices for state in guild_states.values()))
+CallbackCounter('memer_audio_cache_hits_total', "Audio cache hits since start", lambda: audio_cache.hits)
+CallbackCounter('memer_audio_cache_misses_total', "Audio cache misses since start", lambda: audio_cache.misses)
+Gauge('memer_audio_cache_hit_ratio', "Audio cache hit ratio since start", lambda: audio_cache.stats()['hit_ratio'])
+Gauge('memer_audio_cache_bytes', "Bytes held by the audio cache", lambda: audio_cache.current_bytes)
+CallbackCounter('memer_sound_pack_hits_total', "Sounds served from the mapped sound pack since start", lambda: audio_cache.pack_hits)
+
+# Loads the sounds of each shown soundboard page ahead of the first click
+page_prefetcher = PagePrefetcher(audio_cache, PREFETCH_WORKERS, PREFETCH_MAX_PENDING)
+CallbackCounter('memer_prefetch_loaded_total', "Sounds loaded into the audio cache ahead of a click",
+                lambda: page_prefetcher.loaded)
+CallbackCounter('memer_prefetch_cancelled_total', "Prefetches dropped because the page changed",
+                lambda: page_prefetcher.cancelled)
+sounds_started = Counter('memer_sounds_started_total', "Sounds added to a mixer, by audio source kind")
+
+# Connect outcomes per (guild, voice endpoint), drives a circuit breaker
+voice_health = VoiceHealthTracker(VOICE_BREAKER_FAILURES, VOICE_BREAKER_COOLDOWN, VOICE_BREAKER_MAX_COOLDOWN)
+
+async def wait_for_own_voice_state(guild, connected, timeout):
+    """Wait until the gateway reports the bot as (dis)connected in guild, returns False on timeout"""
+    if (guild.me.voice is not None and guild.me.voice.channel is not None) == connected:
+        return True
+    
+    def check(member, before, after):
+        return (member.id == bot.user.id and member.guild.id == guild.id
+                and (after.channel is not None) == connected)
+    
+    try:
+        await bot.wait_for('voice_state_update', check=check, timeout=timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
 
-async def force_disconnect_and_wait(guild, wait_time=5):
-    """Force disconnect and wait for cleanup"""
+async def force_disconnect_and_wait(guild, timeout=3):
+    """Force disconnect and wait until Discord confirms the bot left voice"""
     if guild.voice_client:
         try:
-            await guild.voice_client.disconnect()
+            await guild.voice_client.disconnect(force=True)
             print(f"Force disconnected from voice channel")
         except Exception as e:
             print(f"Error during force disconnect: {e}")
     
-    await asyncio.sleep(wait_time)
+    if timeout > 0 and not await wait_for_own_voice_state(guild, False, timeout):
+        print("Timed out waiting for voice disconnect confirmation")
 
-async def try_alternative_connection(guild, voice_channel):
-    """Try alternative connection methods when standard connection fails"""
-    
-    # Method 1: Try with different timeout
-    try:
-        print("Trying alternative connection method 1: Extended timeout")
-        await voice_channel.connect(timeout=60.0)
-        await asyncio.sleep(2)
-        if guild.voice_client and guild.voice_client.is_connected():
-            return guild.voice_client
-    except Exception as e:
-        print(f"Alternative method 1 failed: {e}")
-    
-    # Method 2: Try with different connection parameters
-    try:
-        print("Trying alternative connection method 2: Different parameters")
-        # Force disconnect first
-        if guild.voice_client:
-            await guild.voice_client.disconnect()
-            await asyncio.sleep(3)
-        
-        # Try connecting with minimal parameters
-        await voice_channel.connect()
-        await asyncio.sleep(2)
-        if guild.voice_client and guild.voice_client.is_connected():
-            return guild.voice_client
-    except Exception as e:
-        print(f"Alternative method 2 failed: {e}")
-    
-    return None
+def current_endpoint(guild):
+    """Voice endpoint of the guild's (possibly half-connected) voice client, if any"""
+    vc = guild.voice_client
+    return getattr(vc, 'endpoint', None) if vc else None
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(VOICE_BACKOFF_CAP, VOICE_BACKOFF_BASE * 2 ** attempt))
 
 async def connect_to_voice_channel(guild, voice_channel, max_retries=3):
-    """Improved voice connection with aggressive retry logic and 4006 handling"""
+    """Voice connection with exponential backoff, jitter and an overall deadline"""
     
-    # Check if we've had recent issues with this guild
-    guild_id = str(guild.id)
-    if guild_id in voice_connection_issues:
-        last_issue_time = voice_connection_issues[guild_id]
-        if time.time() - last_issue_time < 120:  # Wait 2 minutes between attempts
-            raise Exception("Recent voice connection issues detected. Please wait 2 minutes before trying again.")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + VOICE_CONNECT_DEADLINE
+    last_error = None
     
     for attempt in range(max_retries):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        
+        # Don't hammer an endpoint that is known to be failing
+        if not voice_health.allow(guild.id):
+            health = voice_health.get(guild.id)
+            raise Exception(f"Voice server {health.endpoint} is unhealthy. "
+                            f"Please try again in {health.retry_after():.0f} seconds.")
+        
+        started = loop.time()
         try:
             print(f"Voice connection attempt {attempt + 1}/{max_retries}")
             
-            # Force disconnect if already connected
-            if guild.voice_client:
-                await force_disconnect_and_wait(guild, 3)
+            # Clear out a stale voice client (healthy ones are reused by the session manager)
+            if guild.voice_client and not guild.voice_client.is_connected():
+                await force_disconnect_and_wait(guild, min(3, remaining))
             
-            # Try to connect with a longer timeout
-            await voice_channel.connect(timeout=45.0)
+            # connect() waits for our voice state and voice server updates and the
+            # voice handshake itself, so it returns as soon as the connection is usable
+            remaining = max(1, deadline - loop.time())
+            vc = await voice_channel.connect(timeout=min(VOICE_CONNECT_ATTEMPT_TIMEOUT, remaining))
             
-            # Wait a moment to ensure connection is stable
-            await asyncio.sleep(2)
-            
-            # Verify connection is working
-            if guild.voice_client and guild.voice_client.is_connected():
+            if vc.is_connected():
                 print("Voice connection successful!")
-                return guild.voice_client
+                voice_health.record_success(guild.id, vc.endpoint, loop.time() - started)
+                voice_connect_seconds.observe(loop.time() - started, outcome='success', close_code='')
+                return vc
+            voice_health.record_failure(guild.id, vc.endpoint)
+            voice_connect_seconds.observe(loop.time() - started, outcome='failure', close_code='')
                 
         except discord.ConnectionClosed as e:
             print(f"Connection attempt {attempt + 1} failed with code {e.code}")
+            voice_health.record_failure(guild.id, current_endpoint(guild), e.code)
+            voice_connect_seconds.observe(loop.time() - started, outcome='failure', close_code=str(e.code))
+            last_error = e
             
-            if e.code == 4006:  # Session timeout/invalid
-                print(f"4006 error detected - trying alternative methods")
-                
-                # Try alternative connection methods
-                alt_client = await try_alternative_connection(guild, voice_channel)
-                if alt_client:
-                    print("Alternative connection method succeeded!")
-                    return alt_client
-                
-                # For 4006, we need to be more aggressive
-                await force_disconnect_and_wait(guild, 8)
-                
-                if attempt < max_retries - 1:
-                    wait_time = min(15, 3 ** attempt)  # Cap at 15 seconds
-                    print(f"Waiting {wait_time} seconds before retry...")
-                    await asyncio.sleep(wait_time)
-                    continue
-                else:
-                    # Mark this guild as having issues
-                    voice_connection_issues[guild_id] = time.time()
-                    raise Exception("Discord voice servers are experiencing issues (4006 error). Please try again in 2 minutes.")
+            if e.code != 4006:
+                raise e
             
-            raise e
+            # Session timeout/invalid: drop the dead session before retrying
+            print(f"4006 error detected - resetting the voice session")
+            await force_disconnect_and_wait(guild, min(3, max(0, deadline - loop.time())))
             
         except discord.ClientException as e:
             if "Already connected to a voice channel" in str(e):
                 if guild.voice_client and guild.voice_client.is_connected():
+                    voice_health.record_success(guild.id, guild.voice_client.endpoint, loop.time() - started)
                     return guild.voice_client
+            voice_health.record_failure(guild.id, current_endpoint(guild))
+            voice_connect_seconds.observe(loop.time() - started, outcome='error', close_code='')
             raise e
             
         except Exception as e:
             print(f"Voice connection attempt {attempt + 1} failed: {str(e)}")
-            if attempt < max_retries - 1:
-                await asyncio.sleep(3)
-                continue
-            raise e
+            voice_health.record_failure(guild.id, current_endpoint(guild))
+            outcome = 'timeout' if isinstance(e, asyncio.TimeoutError) else 'error'
+            voice_connect_seconds.observe(loop.time() - started, outcome=outcome, close_code='')
+            last_error = e
+        
+        if attempt < max_retries - 1:
+            delay = backoff_delay(attempt)
+            if loop.time() + delay >= deadline:
+                break
+            print(f"Waiting {delay:.1f} seconds before retry...")
+            await asyncio.sleep(delay)
     
-    # Mark this guild as having issues
-    voice_connection_issues[guild_id] = time.time()
-    raise Exception(f"Failed to connect to voice channel after {max_retries} attempts")
+    if isinstance(last_error, discord.ConnectionClosed):
+        raise Exception("Discord voice servers are experiencing issues (4006 error). Please try again shortly.")
+    raise Exception(f"Failed to connect to voice channel within {VOICE_CONNECT_DEADLINE:.0f} seconds: {last_error}")
+
+# Reuse voice connections between clicks and close them when idle
+voice_sessions = VoiceSessionManager(connect_to_voice_channel, VOICE_IDLE_TIMEOUT)
+
+# Opt-in connects ahead of the first click in recently active guilds
+voice_prewarm = VoicePrewarmPolicy(VOICE_PREWARM_RECENT_USE, VOICE_PREWARM_MAX_CONNECTIONS,
+                                   VOICE_PREWARM_MAX_PER_GUILD_HOURLY)
+voice_prewarms = Counter('memer_voice_prewarms_total', "Predictive voice connects by outcome")
 
-class SoundButton(Button):
-    def __init__(self, label, sound_file, category):
+async def prewarm_voice(guild, voice_channel):
+    """Connect before anyone clicks; the session closes after VOICE_PREWARM_IDLE unless a sound is played"""
+    try:
+        await voice_sessions.get(guild, voice_channel, idle_timeout=VOICE_PREWARM_IDLE)
+        voice_prewarms.inc(outcome='connected')
+        print(f"Prewarmed voice connection in {voice_channel.name}")
+    except Exception as e:
+        voice_prewarm.take(guild.id)
+        voice_prewarms.inc(outcome='failed')
+        print(f"Voice prewarm failed in guild {guild.id}: {e}")
+
+def start_sound(state, sound_key, sound_file, on_start=None):
+    """Add a sound to the guild's mixer, returns False if every voice is busy"""
+    started = time.perf_counter()
+    source = audio_cache.source(sound_key, sound_file)
+    if isinstance(source, PackedOpusSource):
+        kind = 'pack'
+    else:
+        kind = 'opus' if isinstance(source, CachedOpusSource) else 'ffmpeg'
+    source_start_seconds.observe(time.perf_counter() - started, kind=kind)
+    if not state.mixer.add(source, name=sound_key, after=lambda e: sound_finished(state, sound_key, e),
+                           on_start=on_start):
+        source.cleanup()
+        return False
+    sounds_started.inc(kind=kind)
+    return True
+
+def sound_finished(state, sound_key, error):
+    """Runs on the audio thread, under the mixer lock, when a sound ends"""
+    if error:
+        print(f"Error while playing {sound_key}: {error}")
+    # Starting a sound can read from disk or spawn ffmpeg, which would stall
+    # every other voice in the mix, so the next one is started on the event loop
+    bot.loop.call_soon_threadsafe(start_next_queued, state)
+
+def start_next_queued(state):
+    item = state.queue.pop()
+    if item:
+        try:
+            if start_sound(state, item.sound_key, item.sound_file):
+                vc = state.voice_client
+                # The mix may have run dry and stopped before this callback ran
+                if vc and vc.is_connected():
+                    state.mixer.ensure_playing(vc, bot.loop)
+        except Exception as e:
+            print(f"Error starting queued sound {item.sound_key}: {e}")
+
+def queue_priority(member):
+    """Moderators jump ahead in the queue when PLAY_QUEUE_MODERATOR_PRIORITY is on"""
+    if PLAY_QUEUE_MODERATOR_PRIORITY and getattr(member, 'guild_permissions', None):
+        perms = member.guild_permissions
+        if perms.manage_guild or perms.manage_messages:
+            return 1
+    return 0
+
+class SoundButton(DynamicItem[Button], template=r'memer:sound:(?P<category>[^:]+):(?P<page>\d+):(?P<index>\d+)'):
+    """Sound button routed by its custom_id, so it keeps working after a restart"""
+
+    def __init__(self, category, page, index, sound_name=None):
+        if sound_name is None:
+            sound_name = categories[category][index]
         # Always use grey style for sound buttons
-        super().__init__(label=f"🎵 {label}", style=discord.ButtonStyle.secondary)
-        self.sound_file = sound_file
+        super().__init__(Button(
+            label=f"🎵 {sound_name}",
+            style=discord.ButtonStyle.secondary,
+            custom_id=f"memer:sound:{category}:{page}:{index}"
+        ))
+        self.label = self.item.label
+        self.sound_key = f"{category}-{sound_name}"
+        self.sound_file = sound_map.get(self.sound_key)
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        # Resolve by the label on the message rather than the index alone,
+        # so a library reload that shifts indexes still plays the clicked sound
+        category, index = match['category'], int(match['index'])
+        sound_name = item.label.removeprefix("🎵 ") if item.label else None
+        return cls(category, int(match['page']), index, sound_name)
 
     async def callback(self, interaction: discord.Interaction):
-        global is_playing
-        
-        if is_playing:
-            await interaction.response.send_message("❌ A sound is already playing!", ephemeral=True)
+        clicked_at = interaction.created_at.timestamp()
+        state = get_guild_state(interaction.guild.id)
+        user = interaction.user
+        voice_prewarm.note_use(interaction.guild.id)
+
+        if not (user.voice and user.voice.channel):
+            await interaction.response.send_message("❌ You must be in a voice channel!", ephemeral=True)
+            click_to_ack.record_since(clicked_at)
             return
 
-        user = interaction.user
+        # Acknowledge first: a voice connect can take far longer than Discord's
+        # 3 second deadline, the result is reported by editing this response
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        click_to_ack.record_since(clicked_at)
 
-        if user.voice and user.voice.channel:
-            voice_channel = user.voice.channel
+        voice_channel = user.voice.channel
 
-            try:
-                # Use improved connection function
-                vc = await connect_to_voice_channel(interaction.guild, voice_channel)
+        # Every voice is busy: wait in the queue instead of dropping the click
+        if state.mixer.active_voices >= state.mixer.max_voices:
+            vc = state.voice_client
+            if vc and vc.is_connected() and not vc.is_playing():
+                # Voices are loaded but the player stopped, get the mix reading again
+                state.mixer.ensure_playing(vc, bot.loop)
+            await self.enqueue(interaction, state)
+            return
 
-                # Verify file exists and print path for debugging
-                if not os.path.exists(self.sound_file):
-                    await interaction.response.send_message(f"❌ Sound file not found: {self.sound_file}", ephemeral=True)
-                    return
+        try:
+            # Reuse the guild's voice session, connecting only if needed
+            vc = await voice_sessions.get(interaction.guild, voice_channel)
+            state.voice_client = vc
+            if voice_prewarm.take(interaction.guild.id):
+                voice_prewarms.inc(outcome='used')
 
-                print(f"Playing sound file: {self.sound_file}")  # Debug print
+            # Verify file exists and print path for debugging
+            if not self.sound_file or not os.path.exists(self.sound_file):
+                await self.reply(interaction, f"❌ Sound file not found: {self.sound_file}")
+                return
 
-                # Disable all buttons
-                for item in self.view.children:
-                    item.disabled = True
+            print(f"Playing sound file: {self.sound_file}")  # Debug print
 
-                # Set playing flag
-                is_playing = True
-                
-                # Play the sound with error handling
-                try:
-                    vc.play(discord.FFmpegPCMAudio(self.sound_file), 
-                           after=lambda e: self.after_playing(e))
-                    await interaction.response.send_message(f"🔊 Playing `{self.label}`!", ephemeral=True)
-                except Exception as e:
-                    print(f"Error playing sound: {str(e)}")  # Debug print
-                    is_playing = False
-                    for item in self.view.children:
-                        item.disabled = False
-                    await interaction.response.send_message(f"❌ Error playing sound: {str(e)}", ephemeral=True)
-
-            except discord.ConnectionClosed as e:
-                error_msg = "❌ Voice connection failed"
-                if e.code == 4006:
-                    error_msg += " (Discord server issue - please try again in 2 minutes)"
-                elif e.code == 4001:
-                    error_msg += " (Unauthorized - check bot permissions)"
-                else:
-                    error_msg += f" (Error code: {e.code})"
-                
-                print(f"Voice connection error: {str(e)}")  # Debug print
-                await interaction.response.send_message(error_msg, ephemeral=True)
-                
+            # Mix the sound into whatever is already playing in this guild
+            try:
+                on_start = lambda: click_to_first_audio.record_since(clicked_at)
+                if not start_sound(state, self.sound_key, self.sound_file, on_start):
+                    await self.enqueue(interaction, state)
+                    return
+                state.mixer.ensure_playing(vc, bot.loop)
+                await self.reply(interaction, f"🔊 Playing `{self.label}`!")
             except Exception as e:
-                print(f"Connection error: {str(e)}")  # Debug print
-                await interaction.response.send_message(f"❌ Error connecting to voice channel: {str(e)}", ephemeral=True)
+                print(f"Error playing sound: {str(e)}")  # Debug print
+                await self.reply(interaction, f"❌ Error playing sound: {str(e)}")
 
-        else:
-            await interaction.response.send_message("❌ You must be in a voice channel!", ephemeral=True)
+        except discord.ConnectionClosed as e:
+            error_msg = "❌ Voice connection failed"
+            if e.code == 4006:
+                error_msg += " (Discord server issue - please try again in 2 minutes)"
+            elif e.code == 4001:
+                error_msg += " (Unauthorized - check bot permissions)"
+            else:
+                error_msg += f" (Error code: {e.code})"
+            
+            print(f"Voice connection error: {str(e)}")  # Debug print
+            await self.reply(interaction, error_msg)
+            
+        except Exception as e:
+            print(f"Connection error: {str(e)}")  # Debug print
+            await self.reply(interaction, f"❌ Error connecting to voice channel: {str(e)}")
 
-    def after_playing(self, error):
-        global is_playing
-        # Reset playing flag
-        is_playing = False
-        
-        # Re-enable all buttons
-        if persistent_view:
-            for item in persistent_view.children:
-                item.disabled = False
+    async def reply(self, interaction, message):
+        """Report a result, editing the deferred response once it has been acknowledged"""
+        if interaction.response.is_done():
+            await interaction.edit_original_response(content=message)
+        else:
+            await interaction.response.send_message(message, ephemeral=True)
 
-@bot.command(name='memer')
-async def memer(ctx):
-    global persistent_message_id, persistent_view
+    async def enqueue(self, interaction, state):
+        item = QueuedSound(self.sound_key, self.sound_file, self.label,
+                           interaction.user.id, queue_priority(interaction.user))
+        try:
+            position = state.queue.push(item)
+            await self.reply(interaction, f"⏳ Queued `{self.label}` (position {position})")
+        except QueueError as e:
+            await self.reply(interaction, f"❌ {e}")
+
+# --- Soundboard Views ---
+BUTTONS_PER_PAGE = 15
+
+# Rendered views keyed by (category, page); views hold no per-message state,
+# so every soundboard message showing the same page shares one view
+soundboard_views = {}
+
+# Position of each category in sorted_categories, for O(1) prev/next lookups
+category_index = {}
+
+def rebuild_category_index():
+    category_index.clear()
+    category_index.update({category: i for i, category in enumerate(sorted_categories)})
+
+def total_pages_for(category):
+    return (len(categories[category]) + BUTTONS_PER_PAGE - 1) // BUTTONS_PER_PAGE
+
+def page_sounds(category, page):
+    """(key, file) of every sound shown on a page"""
+    names = categories[category][page * BUTTONS_PER_PAGE:(page + 1) * BUTTONS_PER_PAGE]
+    keys = [f"{category}-{name}" for name in names]
+    return [(key, sound_map[key]) for key in keys if key in sound_map]
+
+def soundboard_content(category, page, total_pages):
+    # Create emphasized category display with emojis and formatting
+    page_info = f" (Page {page + 1}/{total_pages})" if total_pages > 1 else ""
+    return f"🎵 **Soundboard Controls**\n📂 Category: ```fix\n{category}```{page_info}"
+
+NAV_BUTTONS = {
+    'prevcat': ("◀️ Prev Category", discord.ButtonStyle.danger),
+    'nextcat': ("Next Category ▶️", discord.ButtonStyle.danger),
+    'prevpage': ("◀️ Prev Page", discord.ButtonStyle.success),
+    'nextpage': ("Next Page ▶️", discord.ButtonStyle.success),
+}
+
+class SoundboardNavButton(DynamicItem[Button], template=r'memer:nav:(?P<action>[a-z]+):(?P<category>[^:]+):(?P<page>\d+)'):
+    """Category/page navigation, the page it was rendered on is encoded in its custom_id"""
+
+    def __init__(self, action, category, page, disabled=False):
+        label, style = NAV_BUTTONS[action]
+        super().__init__(Button(
+            label=label,
+            style=style,
+            disabled=disabled,
+            custom_id=f"memer:nav:{action}:{category}:{page}"
+        ))
+        self.action = action
+        self.category = category
+        self.page = page
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(match['action'], match['category'], int(match['page']))
+
+    async def callback(self, interaction):
+        voice_prewarm.note_use(interaction.guild.id)
+        category, page = self.category, self.page
+        if self.action in ('prevcat', 'nextcat'):
+            # Neighbours are looked up at click time so a library reload never leaves stale targets
+            step = -1 if self.action == 'prevcat' else 1
+            current_idx = category_index.get(category, 0)
+            category, page = sorted_categories[(current_idx + step) % len(sorted_categories)], 0
+        else:
+            page += -1 if self.action == 'prevpage' else 1
+        await show_soundboard_page(interaction, category, page)
+
+class SoundboardFiller(DynamicItem[Button], template=r'memer:empty:(?P<slot>\d+)'):
+    """Disabled spacer button"""
+
+    def __init__(self, slot):
+        super().__init__(Button(
+            label="\u200b",
+            style=discord.ButtonStyle.secondary,
+            disabled=True,
+            custom_id=f"memer:empty:{slot}"
+        ))
+
+    @classmethod
+    async def from_custom_id(cls, interaction, item, match):
+        return cls(int(match['slot']))
+
+    async def callback(self, interaction):
+        await interaction.response.defer()
+
+# One persistent handler per component type, routed by custom_id
+bot.add_dynamic_items(SoundButton, SoundboardNavButton, SoundboardFiller)
+
+def build_soundboard_view(category, page):
+    """Build the view for one soundboard page"""
+    category_view = View(timeout=None)
+    filler_slots = iter(range(25))
     
-    # Delete the command message
-    try:
-        await ctx.message.delete()
-    except discord.errors.NotFound:
-        pass  # Ignore if the message was already deleted
-
-    # Delete previous bot messages in the channel
-    async for message in ctx.channel.history(limit=100):  # Limit to last 100 messages
-        if message.author == bot.user:  # Check if message is from our bot
-            try:
-                await message.delete()
-            except discord.errors.NotFound:
-                pass  # Ignore if message was already deleted
-    
-    # Create a new view
-    view = View(timeout=None)
-    
-    # Initialize variables for pagination
-    buttons_per_page = 15
-    current_page = 0
-    current_category = sorted_categories[0]  # Start with first sorted category
-    
-    # Function to create category buttons
-    def create_category_buttons():
-        nonlocal current_category
-        category_view = View(timeout=None)
-        
-        # Get sounds for current category
-        category_sounds = categories[current_category]
-        total_pages = (len(category_sounds) + buttons_per_page - 1) // buttons_per_page
-        
-        # First row: Category navigation (Red)
-        if len(sorted_categories) > 1:
-            prev_cat = Button(
-                label="◀️ Prev Category", 
-                style=discord.ButtonStyle.danger
-            )
-            next_cat = Button(
-                label="Next Category ▶️", 
-                style=discord.ButtonStyle.danger
-            )
-            
-            async def prev_category_callback(interaction):
-                nonlocal current_category, current_page
-                current_idx = sorted_categories.index(current_category)
-                current_category = sorted_categories[(current_idx - 1) % len(sorted_categories)]
-                current_page = 0
-                await update_view(interaction)
-                
-            async def next_category_callback(interaction):
-                nonlocal current_category, current_page
-                current_idx = sorted_categories.index(current_category)
-                current_category = sorted_categories[(current_idx + 1) % len(sorted_categories)]
-                current_page = 0
-                await update_view(interaction)
-            
-            prev_cat.callback = prev_category_callback
-            next_cat.callback = next_category_callback
-            
-            # Add category navigation buttons with an empty button in between
-            category_view.add_item(prev_cat)
-            empty_button = Button(label="\u200b", style=discord.ButtonStyle.secondary, disabled=True)
-            category_view.add_item(empty_button)
-            category_view.add_item(next_cat)
-        
-        # Middle rows: Sound buttons
-        start_idx = current_page * buttons_per_page
-        end_idx = min(start_idx + buttons_per_page, len(category_sounds))
-        
-        for i in range(start_idx, end_idx):
-            sound_name = category_sounds[i]
-            full_name = f"{current_category}-{sound_name}"
-            button = SoundButton(
-                label=sound_name,
-                sound_file=sound_map[full_name],
-                category=current_category
-            )
-            category_view.add_item(button)
-        
-        # Add empty buttons to complete the last sound row
-        remaining_in_row = 3 - (len(category_view.children) % 3)
-        if remaining_in_row < 3:
-            for _ in range(remaining_in_row):
-                empty_button = Button(label="\u200b", style=discord.ButtonStyle.secondary, disabled=True)
-                category_view.add_item(empty_button)
-        
-        # Last row: Page navigation (Green)
-        if total_pages > 1:
-            prev_page = Button(
-                label="◀️ Prev Page", 
-                style=discord.ButtonStyle.success
-            )
-            next_page = Button(
-                label="Next Page ▶️", 
-                style=discord.ButtonStyle.success
-            )
-            
-            async def prev_page_callback(interaction):
-                nonlocal current_page
-                current_page = max(0, current_page - 1)
-                await update_view(interaction)
-                
-            async def next_page_callback(interaction):
-                nonlocal current_page
-                current_page = min(total_pages - 1, current_page + 1)
-                await update_view(interaction)
-            
-            prev_page.callback = prev_page_callback
-            next_page.callback = next_page_callback
-            
-            prev_page.disabled = (current_page == 0)
-            next_page.disabled = (current_page == total_pages - 1)
-            
-            # Add page navigation buttons with an empty button in between
-            category_view.add_item(prev_page)
-            empty_button = Button(label="\u200b", style=discord.ButtonStyle.secondary, disabled=True)
-            category_view.add_item(empty_button)
-            category_view.add_item(next_page)
-        
-        return category_view, total_pages
+    # Get sounds for current category
+    category_sounds = categories[category]
+    total_pages = total_pages_for(category)
     
-    # Create initial view
-    view, total_pages = create_category_buttons()
+    # First row: Category navigation (Red)
+    if len(sorted_categories) > 1:
+        # Add category navigation buttons with an empty button in between
+        category_view.add_item(SoundboardNavButton('prevcat', category, page))
+        category_view.add_item(SoundboardFiller(next(filler_slots)))
+        category_view.add_item(SoundboardNavButton('nextcat', category, page))
     
-    # Store view globally
-    persistent_view = view
+    # Middle rows: Sound buttons
+    start_idx = page * BUTTONS_PER_PAGE
+    end_idx = min(start_idx + BUTTONS_PER_PAGE, len(category_sounds))
     
-    # Send the message
-    page_info = f" (Page {current_page + 1}/{total_pages})" if total_pages > 1 else ""
-    message = await ctx.send(
-        f"🎵 **Soundboard Controls**\n📂 Category: ```fix\n{current_category}```{page_info}",
+    for i in range(start_idx, end_idx):
+        category_view.add_item(SoundButton(category, page, i))
+    
+    # Add empty buttons to complete the last sound row
+    remaining_in_row = 3 - (len(category_view.children) % 3)
+    if remaining_in_row < 3:
+        for _ in range(remaining_in_row):
+            category_view.add_item(SoundboardFiller(next(filler_slots)))
+    
+    # Last row: Page navigation (Green)
+    if total_pages > 1:
+        # Add page navigation buttons with an empty button in between
+        category_view.add_item(SoundboardNavButton('prevpage', category, page, disabled=(page == 0)))
+        category_view.add_item(SoundboardFiller(next(filler_slots)))
+        category_view.add_item(SoundboardNavButton('nextpage', category, page, disabled=(page == total_pages - 1)))
+    
+    # Every item is routed by custom_id, so the view never needs to be tracked
+    # per message; a stopped view is sent without being stored at all
+    category_view.stop()
+    return category_view
+
+def get_soundboard_view(category, page):
+    """Return the cached view for a page, building it on first use.
+    Returns the (possibly corrected) category and page along with the view."""
+    # The category or page may have disappeared in a sound library reload
+    if category not in categories:
+        category, page = sorted_categories[0], 0
+    total_pages = total_pages_for(category)
+    page = min(max(page, 0), max(0, total_pages - 1))
+    
+    view = soundboard_views.get((category, page))
+    if view is None:
+        view = soundboard_views[(category, page)] = build_soundboard_view(category, page)
+    return category, page, total_pages, view
+
+def invalidate_soundboard_views(changed_categories=None):
+    """Drop cached views for the given categories, or all of them"""
+    if changed_categories is None:
+        soundboard_views.clear()
+        rebuild_category_index()
+        return
+    for key in [key for key in soundboard_views if key[0] in changed_categories]:
+        del soundboard_views[key]
+
+def prewarm_soundboard_views():
+    for category in sorted_categories:
+        for page in range(max(1, total_pages_for(category))):
+            get_soundboard_view(category, page)
+
+async def show_soundboard_page(interaction, category, page):
+    category, page, total_pages, view = get_soundboard_view(category, page)
+    await interaction.response.edit_message(
+        content=soundboard_content(category, page, total_pages),
         view=view
     )
-    persistent_message_id = message.id
+    page_prefetcher.prefetch(interaction.message.id, page_sounds(category, page))
+
+rebuild_category_index()
+# --- End of Soundboard Views ---
+
+# Discord only bulk deletes messages younger than 14 days, keep a margin for clock skew
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14, minutes=-5)
+
+async def delete_messages_bulk(channel, message_ids):
+    """Delete messages by id, 100 per bulk request, one by one only when too old to bulk delete"""
+    cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+    recent = [channel.get_partial_message(i) for i in message_ids if discord.utils.snowflake_time(i) > cutoff]
+    old = [channel.get_partial_message(i) for i in message_ids if discord.utils.snowflake_time(i) <= cutoff]
     
-    async def update_view(interaction):
-        new_view, total_pages = create_category_buttons()
-        page_info = f" (Page {current_page + 1}/{total_pages})" if total_pages > 1 else ""
-        
-        # Create emphasized category display with emojis and formatting
-        category_display = f"🎵 **Soundboard Controls**\n📂 Category: ```fix\n{current_category}```{page_info}"
-        
-        await interaction.response.edit_message(
-            content=category_display,
-            view=new_view
-        )
+    for start in range(0, len(recent), 100):
+        try:
+            await channel.delete_messages(recent[start:start + 100])
+        except discord.NotFound:
+            pass  # Ignore if the message was already deleted
+    for message in old:
+        try:
+            await message.delete()
+        except discord.NotFound:
+            pass
+
+async def clear_previous_soundboards(ctx, state):
+    """Delete the command message and the bot's earlier messages in the channel"""
+    channel = ctx.channel
+    tracked = state.take_messages(channel.id)
+    # A slash command has no message of its own to delete, ctx.message is synthetic
+    command_ids = [] if ctx.interaction else [ctx.message.id]
+    try:
+        if channel.id not in state.swept_channels:
+            # Nothing tracked from before this start yet: one history page plus a bulk delete.
+            # The new board is sent concurrently, anything newer than the command is kept.
+            await channel.purge(limit=100, check=lambda m: m.id <= ctx.message.id
+                                and (m.author == bot.user or m.id in command_ids))
+            state.swept_channels.add(channel.id)
+        else:
+            await delete_messages_bulk(channel, [*command_ids, *tracked])
+    except discord.Forbidden:
+        # Bulk deletes need Manage Messages, the bot can always delete its own messages
+        for message_id in tracked:
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.NotFound:
+                pass
+    except discord.HTTPException as e:
+        print(f"Error clearing previous soundboards: {e}")
+    for message_id in tracked:
+        state.remove_message(message_id)
+
+@bot.hybrid_command(name='memer')
+async def memer(ctx):
+    """Open the soundboard in this channel"""
+    state = get_guild_state(ctx.guild.id)
+    
+    # Start with first sorted category
+    category, page, total_pages, view = get_soundboard_view(sorted_categories[0], 0)
+    
+    # Clean up and send the new board concurrently, so opening it costs one round trip
+    _, message = await asyncio.gather(
+        clear_previous_soundboards(ctx, state),
+        ctx.send(soundboard_content(category, page, total_pages), view=view),
+    )
+    state.soundboard_message_id = message.id
+    page_prefetcher.prefetch(message.id, page_sounds(category, page))
+    # on_message never fires for it in the lean profile, track it here too
+    state.track_message(message.channel.id, message.id)
 
-@bot.command()
+@bot.hybrid_command()
 async def removesoundboard(ctx):
-    global persistent_message_id, persistent_view
-    if persistent_message_id:
+    """Delete the soundboard message"""
+    state = get_guild_state(ctx.guild.id)
+    if state.soundboard_message_id:
         try:
-            message = await ctx.channel.fetch_message(persistent_message_id)
+            message = ctx.channel.get_partial_message(state.soundboard_message_id)
             await message.delete()
-            persistent_message_id = None
-            persistent_view = None
+            state.remove_message(message.id)
+            page_prefetcher.cancel(message.id)
             await ctx.send("✅ Soundboard removed!", ephemeral=True)
         except discord.NotFound:
             await ctx.send("❌ Could not find the soundboard message.", ephemeral=True)
     else:
         await ctx.send("❌ No soundboard is currently active.", ephemeral=True)
 
-@bot.command()
+@bot.hybrid_command()
 async def disconnect(ctx):
+    """Leave the voice channel"""
     if ctx.guild.voice_client:
-        await ctx.guild.voice_client.disconnect()
+        await voice_sessions.close(ctx.guild)
         await ctx.send("✅ Disconnected from voice channel!", ephemeral=True)
     else:
         await ctx.send("❌ I'm not connected to any voice channel!", ephemeral=True)
 
-@bot.command()
+@bot.hybrid_command()
 async def voicefix(ctx):
     """Force disconnect and clear any stuck voice states"""
-    global voice_connection_issues
-    
-    # Clear connection issue tracking for this guild
-    guild_id = str(ctx.guild.id)
-    if guild_id in voice_connection_issues:
-        del voice_connection_issues[guild_id]
-        print(f"Cleared connection issue tracking for guild {guild_id}")
+    # Clear voice server health tracking for this guild
+    voice_health.reset(ctx.guild.id)
+    print(f"Cleared voice health tracking for guild {ctx.guild.id}")
     
     if ctx.guild.voice_client:
         try:
-            await ctx.guild.voice_client.disconnect()
+            await voice_sessions.close(ctx.guild)
             await ctx.send("✅ Force disconnected from voice channel and cleared issue tracking!", ephemeral=True)
         except Exception as e:
             await ctx.send(f"❌ Error during disconnect: {str(e)}", ephemeral=True)
     else:
         await ctx.send("✅ No voice client to disconnect! Issue tracking cleared.", ephemeral=True)
 
-@bot.command()
+@bot.hybrid_command()
 async def clearvoiceissues(ctx):
     """Clear all voice connection issue tracking"""
-    global voice_connection_issues
-    voice_connection_issues.clear()
+    voice_health.reset()
     await ctx.send("✅ Cleared all voice connection issue tracking!", ephemeral=True)
 
-@bot.command()
-async def voicenetwork(ctx):
-    """Test network connectivity to Discord voice servers"""
-    import socket
+@bot.hybrid_command()
+async def voicenetwork(ctx, *, hosts: str = ""):
+    """Test network connectivity to Discord voice servers (optionally pass hostnames)"""
+    hosts = hosts.replace(',', ' ').split() or list(VOICE_PROBE_HOSTS)
+    message = await ctx.send(f"🌐 Testing network connectivity to {len(hosts)} host(s)...", ephemeral=True)
     
-    await ctx.send("🌐 Testing network connectivity to Discord voice servers...", ephemeral=True)
+    # Also test the voice server this guild is actually using
+    endpoint = current_endpoint(ctx.guild)
+    if endpoint and endpoint.split(':')[0] not in hosts:
+        hosts.append(endpoint.split(':')[0])
     
-    # Test Discord API
-    try:
-        socket.create_connection(("discord.com", 443), timeout=10)
-        await ctx.send("✅ Discord API: OK", ephemeral=True)
-    except Exception as e:
-        await ctx.send(f"❌ Discord API: FAILED - {str(e)}", ephemeral=True)
-        return
-    
-    # Test Discord Gateway
-    try:
-        socket.create_connection(("gateway.discord.gg", 443), timeout=10)
-        await ctx.send("✅ Discord Gateway: OK", ephemeral=True)
-    except Exception as e:
-        await ctx.send(f"❌ Discord Gateway: FAILED - {str(e)}", ephemeral=True)
+    results = await probe_hosts(hosts, samples=VOICE_PROBE_SAMPLES, timeout=VOICE_PROBE_TIMEOUT)
     
-    # Test specific voice server from logs
-    try:
-        socket.create_connection(("c-fra16-e2ce8198.discord.media", 443), timeout=10)
-        await ctx.send("✅ Voice server c-fra16-e2ce8198.discord.media: OK", ephemeral=True)
-    except Exception as e:
-        await ctx.send(f"❌ Voice server c-fra16-e2ce8198.discord.media: FAILED - {str(e)}", ephemeral=True)
-    
-    # Test alternative voice servers
-    alternative_servers = [
-        "c-fra16-e2ce8199.discord.media",
-        "c-fra16-e2ce8200.discord.media",
-        "c-fra16-e2ce8201.discord.media"
-    ]
-    
-    for server in alternative_servers:
-        try:
-            socket.create_connection((server, 443), timeout=10)
-            await ctx.send(f"✅ Voice server {server}: OK", ephemeral=True)
-        except Exception as e:
-            await ctx.send(f"❌ Voice server {server}: FAILED - {str(e)}", ephemeral=True)
-    
-    await ctx.send("🎯 Network tests complete!", ephemeral=True)
+    summary = f"🎯 **Network tests complete** ({VOICE_PROBE_SAMPLES} TCP connects per host)\n"
+    summary += "\n".join(result.summary() for result in results)
+    await message.edit(content=summary)
 
-@bot.command()
+@bot.hybrid_command()
 async def voiceinfo(ctx):
     """Show detailed voice connection information"""
     vc = ctx.guild.voice_client
@@ -542,12 +687,24 @@ async def voiceinfo(ctx):
         info += f"🔊 Playing: {vc.is_playing()}\n"
         info += f"🌐 Endpoint: {endpoint}\n"
         info += f"🔗 Latency: {vc.latency:.3f}s" if hasattr(vc, 'latency') else "🔗 Latency: Unknown"
-        
-        await ctx.send(info, ephemeral=True)
     else:
-        await ctx.send("❌ Not connected to any voice channel", ephemeral=True)
+        info = "❌ Not connected to any voice channel"
+    
+    # Voice server health and circuit breaker state
+    endpoints = voice_health.for_guild(ctx.guild.id)
+    if endpoints:
+        info += "\n\n🩺 **Voice Server Health:**"
+        for health in endpoints:
+            rate = f"{health.success_rate:.0%}" if health.success_rate is not None else "n/a"
+            avg = f"{health.avg_latency:.2f}s" if health.avg_latency is not None else "n/a"
+            info += f"\n🌐 {health.endpoint}: {health.state}"
+            if health.retry_after() > 0:
+                info += f" (retry in {health.retry_after():.0f}s)"
+            info += f" | ✅ {health.successes} ❌ {health.failures} ({rate}) | 4006: {health.errors_4006} | avg connect {avg}"
+    
+    await ctx.send(info, ephemeral=True)
 
-@bot.command()
+@bot.hybrid_command()
 async def voicestatus(ctx):
     """Check the current voice connection status"""
     vc = ctx.guild.voice_client
@@ -558,18 +715,183 @@ async def voicestatus(ctx):
     else:
         await ctx.send("❌ Not connected to any voice channel", ephemeral=True)
 
+@bot.hybrid_command(name='queue')
+async def show_queue(ctx):
+    """Show the sounds playing and waiting in this guild"""
+    state = get_guild_state(ctx.guild.id)
+    playing = state.mixer.voice_names()
+    queued = state.queue.snapshot()
+    if not playing and not queued:
+        await ctx.send("📭 Nothing is playing or queued.", ephemeral=True)
+        return
+
+    info = f"🎶 **Now Playing ({len(playing)}/{state.mixer.max_voices}):**\n"
+    info += "\n".join(f"🔊 {name}" for name in playing) or "None"
+    info += f"\n⏳ **Queued ({len(queued)}/{state.queue.max_depth}):**\n"
+    info += "\n".join(f"{i}. {item.label}" for i, item in enumerate(queued, 1)) or "None"
+    await ctx.send(info, ephemeral=True)
+
+@bot.hybrid_command()
+async def skip(ctx):
+    """Stop the oldest playing sound and start the next queued one"""
+    state = get_guild_state(ctx.guild.id)
+    skipped = state.mixer.skip()
+    if skipped:
+        await ctx.send(f"⏭️ Skipped `{skipped}`", ephemeral=True)
+    else:
+        await ctx.send("❌ Nothing is playing!", ephemeral=True)
+
+@bot.hybrid_command()
+async def latency(ctx):
+    """Show click-to-acknowledgement and click-to-first-audio latency"""
+    info = f"⏱️ **Soundboard Latency:**\n"
+    info += f"{click_to_ack.summary()}\n"
+    info += click_to_first_audio.summary()
+    await ctx.send(info, ephemeral=True)
+
+@bot.hybrid_command()
+async def audiostats(ctx):
+    """Show frame pacing of this server's audio playback"""
+    pacing = get_guild_state(ctx.guild.id).mixer.pacing
+    reads = pacing.read_percentiles(50, 95, 99)
+    info = f"🎚️ **Audio Frame Pacing:**\n"
+    info += f"📊 Since start: {pacing.total.summary()}\n"
+    if pacing.last_run is not None:
+        info += f"▶️ Last playback: {pacing.last_run.summary()}\n"
+    if reads:
+        info += (f"⏱️ Frame read p50 {reads[50] * 1000:.2f}ms, p95 {reads[95] * 1000:.2f}ms, "
+                 f"p99 {reads[99] * 1000:.2f}ms\n")
+    info += "💡 Slow reads point at decode or disk, late frames with fast reads at a busy host or event loop"
+    await ctx.send(info, ephemeral=True)
+
+@bot.hybrid_command()
+async def cachestats(ctx):
+    """Show audio cache hit/miss counters"""
+    stats = audio_cache.stats()
+    info = f"🗃️ **Audio Cache:**\n"
+    info += f"📦 Entries: {stats['entries']}\n"
+    info += f"💾 Memory: {stats['bytes'] / 1024 / 1024:.1f} / {stats['max_bytes'] / 1024 / 1024:.0f} MB\n"
+    info += f"✅ Hits: {stats['hits']}\n"
+    info += f"❌ Misses: {stats['misses']}\n"
+    info += f"♻️ Evictions: {stats['evictions']}\n"
+    info += f"📼 Sound pack: {stats['pack_sounds']} sounds, {stats['pack_bytes'] / 1024 / 1024:.1f} MB mapped, {stats['pack_hits']} hits\n"
+    info += f"⏩ Prefetched: {page_prefetcher.loaded} sounds loaded, {page_prefetcher.cancelled} cancelled by page changes\n"
+    info += f"🎯 Hit ratio: {stats['hit_ratio']:.1%}"
+    await ctx.send(info, ephemeral=True)
+
+@tasks.loop(seconds=max(SOUND_RELOAD_INTERVAL, 1))
+async def reload_sounds():
+    """Apply added, removed and renamed sound files to the live catalog"""
+    if SHARED_ASSETS:
+        # The supervisor rebuilds the pack on its own schedule
+        await refresh_sound_pack()
+    # Workers follow the supervisor's manifest instead of probing files themselves
+    changes = await asyncio.to_thread(catalog.scan_manifest if SHARED_ASSETS else catalog.scan)
+    if not changes:
+        return
+    
+    # Only drop what the change touched, everything else stays warm
+    for key in changes.affected_keys():
+        audio_cache.invalidate(key)
+    old_categories = list(sorted_categories)
+    catalog.apply(changes)
+    
+    # Category navigation spans every category, so a new or removed one invalidates all views
+    if sorted_categories != old_categories:
+        invalidate_soundboard_views()
+    else:
+        invalidate_soundboard_views(changes.affected_categories())
+    print(f"Sound library reloaded: {changes.summary()}")
+    
+    if not SHARED_ASSETS:
+        try:
+            pack = await asyncio.to_thread(update_sound_assets, changes, audio_cache.pack)
+        except Exception as e:
+            print(f"Failed to update sound assets: {e}")
+            return
+        if pack is not None:
+            # Sources still playing from the old mapping keep it alive until they finish
+            audio_cache.pack = pack
+
+async def refresh_sound_pack():
+    """Rebuild and remap the sound pack if it is missing or behind the catalog"""
+    if SHARED_ASSETS:
+        # Only map the supervisor's pack, every shard process shares its pages
+        if audio_cache.pack is None or audio_cache.pack.replaced():
+            audio_cache.pack = load_pack()
+        return
+    try:
+        pack = await asyncio.to_thread(refresh_pack, dict(catalog.entries), audio_cache.pack)
+    except Exception as e:
+        print(f"Failed to build the sound pack: {e}")
+        return
+    if pack is not None:
+        # Sources still playing from the old mapping keep it alive until they finish
+        audio_cache.pack = pack
+
+# aiohttp runner of the /metrics endpoint, started once on the first on_ready
+metrics_runner = None
+app_commands_synced = False
+
 @bot.event
 async def on_ready():
     print(f"🎉 Logged in as {bot.user}")
+    # Pre-encode any new or changed sounds so clicks never spawn ffmpeg
+    if not SHARED_ASSETS:
+        await asyncio.to_thread(build_cache, list(sound_map.values()))
+    await refresh_sound_pack()
+    
+    prewarm_soundboard_views()
+    
+    global metrics_runner
+    if METRICS_PORT > 0 and metrics_runner is None:
+        try:
+            metrics_runner = await start_metrics_server(METRICS_PORT, METRICS_HOST)
+            asyncio.create_task(monitor_event_loop_lag())
+        except Exception as e:
+            print(f"Could not start the metrics endpoint: {e}")
+    
+    global app_commands_synced
+    # In sharded mode only the process running shard 0 registers the slash commands
+    if SYNC_APP_COMMANDS and not app_commands_synced and (not SHARD_IDS or 0 in SHARD_IDS):
+        try:
+            synced = await bot.tree.sync()
+            app_commands_synced = True
+            print(f"Synced {len(synced)} slash commands")
+        except discord.HTTPException as e:
+            print(f"Failed to sync slash commands: {e}")
+    
+    if SOUND_RELOAD_INTERVAL > 0 and not reload_sounds.is_running():
+        reload_sounds.start()
+
+@bot.listen('on_message')
+async def track_own_messages(message):
+    """Remember the bot's own messages so /memer can delete them without a history scan"""
+    if message.author == bot.user and message.guild is not None:
+        get_guild_state(message.guild.id).track_message(message.channel.id, message.id)
 
 @bot.event
 async def on_voice_state_update(member, before, after):
     """Handle voice state changes to clean up when users leave"""
-    # If the bot is disconnected from voice, reset the playing flag
+    # If the bot is disconnected from voice, drop whatever was still mixing
     if member.id == bot.user.id and before.channel and not after.channel:
-        global is_playing
-        is_playing = False
-        print("Bot disconnected from voice channel, resetting playing flag")
+        state = get_guild_state(member.guild.id)
+        state.queue.clear()
+        state.mixer.clear()
+        state.voice_client = None
+        print("Bot disconnected from voice channel, clearing the mixer")
+        if voice_prewarm.take(member.guild.id):
+            voice_prewarms.inc(outcome='expired')
+        return
+    
+    # A member joined voice in a recently active guild: connect before their first click
+    guild = member.guild
+    if (VOICE_PREWARM and not member.bot and after.channel and before.channel != after.channel
+            and not guild.voice_client and after.channel.permissions_for(guild.me).connect
+            and voice_health.retry_after(guild.id) == 0
+            and voice_prewarm.should_prewarm(guild.id)):
+        voice_prewarm.started(guild.id)
+        asyncio.create_task(prewarm_voice(guild, after.channel))
 
 @bot.event
 async def on_command_error(ctx, error):
@@ -580,4 +902,6 @@ async def on_command_error(ctx, error):
     print(f"Command error in {ctx.command}: {error}")
     await ctx.send(f"❌ An error occurred: {str(error)}", ephemeral=True)
 
-bot.run(discord_token)
\ No newline at end of file
+if __name__ == "__main__":
+    from pws import discord_token
+    bot.run(discord_token)
@@ -0,0 +1,199 @@
+"""
+Hot-path metrics
+Fixed-bucket histograms, counters and gauges exposed as Prometheus text on a
+local HTTP port, plus rolling latency windows for the /latency command.
+Observations are a bisect and two additions under a lock, cheap enough to
+call from the audio player thread.
+"""
+
+import asyncio
+import bisect
+import threading
+import time
+from collections import deque
+
+# Seconds; covers sub-millisecond frame work up to slow voice connects
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        # label tuple -> [bucket counts..., sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', bound),))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {values[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {values[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+        return lines
+
+
+class Gauge:
+    """A gauge whose value is read from a callback at scrape time"""
+
+    metric_type = 'gauge'
+
+    def __init__(self, name, help_text, callback):
+        self.name = name
+        self.help_text = help_text
+        self.callback = callback
+        _registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        try:
+            lines.append(f"{self.name} {self.callback()}")
+        except Exception as e:
+            print(f"Error reading gauge {self.name}: {e}")
+        return lines
+
+
+class CallbackCounter(Gauge):
+    """A counter whose total is kept elsewhere and read at scrape time"""
+
+    metric_type = 'counter'
+
+
+def render_metrics():
+    """All registered metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def percentiles(samples, *points):
+    """Nearest-rank percentiles of samples as {point: value}, empty without samples"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    return {p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in points}
+
+
+class LatencyTracker:
+    """Rolling window of recent samples for percentiles, optionally mirrored into a histogram"""
+
+    def __init__(self, name, window=1000, histogram=None):
+        self.name = name
+        self.count = 0
+        self.histogram = histogram
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        # Samples can come from the audio player thread as well as the event loop
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+        if self.histogram is not None:
+            self.histogram.observe(seconds)
+
+    def record_since(self, started_at):
+        """Record the wall-clock time elapsed since a time.time() timestamp"""
+        self.record(max(0.0, time.time() - started_at))
+
+    def percentiles(self, *points):
+        with self._lock:
+            samples = list(self._samples)
+        return percentiles(samples, *points)
+
+    def summary(self):
+        values = self.percentiles(50, 95, 99)
+        if not values:
+            return f"{self.name}: no samples"
+        return (f"{self.name}: p50 {values[50] * 1000:.0f}ms, p95 {values[95] * 1000:.0f}ms, "
+                f"p99 {values[99] * 1000:.0f}ms ({self.count} total)")
+
+
+interaction_ack_seconds = Histogram(
+    'memer_interaction_ack_seconds', "Time from a button click to its interaction acknowledgement")
+first_audio_seconds = Histogram(
+    'memer_first_audio_seconds', "Time from a button click to the first mixed audio frame")
+voice_connect_seconds = Histogram(
+    'memer_voice_connect_seconds', "Duration of each voice connect attempt by outcome and close code")
+source_start_seconds = Histogram(
+    'memer_source_start_seconds', "Time to create an audio source (cached Opus or ffmpeg)")
+event_loop_lag_seconds = Histogram(
+    'memer_event_loop_lag_seconds', "How late the event loop woke up a periodic timer")
+
+# Click (interaction creation time) to acknowledgement, and to the first audio frame
+click_to_ack = LatencyTracker("Click → ack", histogram=interaction_ack_seconds)
+click_to_first_audio = LatencyTracker("Click → first audio", histogram=first_audio_seconds)
+
+
+async def monitor_event_loop_lag(interval=0.5):
+    """Measure how far past its deadline a sleep wakes up; a busy loop shows up as lag"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        event_loop_lag_seconds.observe(max(0.0, loop.time() - expected))
+
+
+async def start_metrics_server(port, host='127.0.0.1'):
+    """Serve render_metrics() at http://host:port/metrics"""
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=render_metrics(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"📈 Metrics available at http://{host}:{port}/metrics")
+    return runner
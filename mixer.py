@@ -0,0 +1,174 @@
+"""
+Real-time PCM mixer
+One AudioSource per guild that sums every active sound into each 20 ms
+frame, so overlapping clicks play together over a single connection and a
+single Opus encoder.
+"""
+
+import threading
+
+import discord
+import numpy as np
+
+from frame_pacing import FramePacing, PacedSource
+
+FRAME_SAMPLES = discord.opus.Encoder.SAMPLES_PER_FRAME * discord.opus.Encoder.CHANNELS
+
+# How fast the limiter gain recovers towards 1.0 per frame after a peak
+LIMITER_RELEASE = 0.02
+
+
+class MixerVoice:
+    """One sound currently playing inside a mixer"""
+
+    def __init__(self, source, name=None, after=None, on_start=None, pacing=None):
+        self.source = source
+        self.name = name
+        self.after = after
+        # Called once from the audio thread when the first frame is read
+        self.on_start = on_start
+        # Frame pacing stats collected while this sound plays
+        self.pacing = pacing
+        self._decoder = None
+
+    def started(self):
+        if self.on_start is not None:
+            on_start, self.on_start = self.on_start, None
+            try:
+                on_start()
+            except Exception as e:
+                print(f"Error in mixer voice start callback: {e}")
+
+    def read_pcm(self):
+        """Read the next frame as 16-bit stereo PCM, decoding Opus sources if needed"""
+        data = self.source.read()
+        if not data:
+            return None
+        if self.source.is_opus():
+            if self._decoder is None:
+                self._decoder = discord.opus.Decoder()
+            data = self._decoder.decode(bytes(data))
+        return data
+
+
+class MixerSource(discord.AudioSource):
+    """Mixes up to max_voices sounds into one stream"""
+
+    def __init__(self, max_voices):
+        self.max_voices = max_voices
+        self._voices = []
+        self._lock = threading.RLock()
+        self._opus = False
+        self._gain = 1.0
+        self.pacing = FramePacing()
+
+    @property
+    def active_voices(self):
+        return len(self._voices)
+
+    def voice_names(self):
+        with self._lock:
+            return [voice.name for voice in self._voices]
+
+    def add(self, source, name=None, after=None, on_start=None):
+        """Start mixing a new sound, returns False if all voices are busy"""
+        with self._lock:
+            if len(self._voices) >= self.max_voices:
+                return False
+            self._voices.append(MixerVoice(source, name, after, on_start, self.pacing.open_window()))
+            return True
+
+    def skip(self):
+        """Stop the oldest sound in the mix, returns its name or None"""
+        with self._lock:
+            if not self._voices:
+                return None
+            voice = self._voices[0]
+            self._finish(voice)
+            return voice.name
+
+    def clear(self):
+        """Stop every sound in the mix"""
+        with self._lock:
+            for voice in list(self._voices):
+                self._finish(voice)
+
+    def _finish(self, voice, error=None):
+        self._voices.remove(voice)
+        if voice.pacing is not None:
+            stats = self.pacing.close_window(voice.pacing)
+            if stats.frames:
+                print(f"🎚️ Frame pacing for {voice.name}: {stats.summary()}")
+        try:
+            voice.source.cleanup()
+        except Exception as e:
+            print(f"Error cleaning up mixer voice: {e}")
+        if voice.after is not None:
+            try:
+                voice.after(error)
+            except Exception as e:
+                print(f"Error in mixer voice callback: {e}")
+
+    def read(self):
+        with self._lock:
+            # A single Opus sound is passed through untouched, no decode or re-encode
+            if len(self._voices) == 1 and self._voices[0].source.is_opus():
+                voice = self._voices[0]
+                packet = voice.source.read()
+                if packet:
+                    voice.started()
+                    self._opus = True
+                    return packet
+                self._finish(voice)
+
+            self._opus = False
+            mixed = None
+            for voice in list(self._voices):
+                try:
+                    pcm = voice.read_pcm()
+                except Exception as e:
+                    print(f"Error reading mixer voice {voice.name}: {e}")
+                    self._finish(voice, e)
+                    continue
+                if not pcm:
+                    self._finish(voice)
+                    continue
+                voice.started()
+
+                samples = np.frombuffer(pcm, dtype=np.int16)
+                if len(samples) < FRAME_SAMPLES:
+                    samples = np.pad(samples, (0, FRAME_SAMPLES - len(samples)))
+                if mixed is None:
+                    mixed = samples.astype(np.float32)
+                else:
+                    mixed += samples
+
+            if mixed is None:
+                return b''
+
+            # Simple peak limiter: duck instantly on overload, recover slowly
+            peak = float(np.abs(mixed).max())
+            target = min(1.0, 32767.0 / peak) if peak else 1.0
+            self._gain = target if target < self._gain else min(1.0, self._gain + LIMITER_RELEASE)
+            if self._gain < 1.0:
+                mixed *= self._gain
+            return np.clip(mixed, -32768, 32767).astype(np.int16).tobytes()
+
+    def is_opus(self):
+        return self._opus
+
+    def ensure_playing(self, vc, loop):
+        """Start playing the mix on vc if it is not already running"""
+        if vc.is_playing() or not vc.is_connected():
+            return
+
+        def restart(error):
+            if error:
+                print(f"Mixer playback error: {error}")
+            # A sound may have been added just as the previous mix ran dry
+            if self._voices:
+                loop.call_soon_threadsafe(self.ensure_playing, vc, loop)
+
+        # Report PCM until the first read so the voice client sets up its encoder
+        self._opus = False
+        vc.play(PacedSource(self, self.pacing), after=restart)
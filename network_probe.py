@@ -0,0 +1,61 @@
+"""
+Non-blocking network probe
+Measures TCP connect time to several hosts concurrently on the event loop,
+so a slow or unreachable host never stalls gateway heartbeats.
+"""
+
+import asyncio
+import time
+
+from metrics import percentiles
+
+
+class ProbeResult:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.samples = []
+        self.errors = []
+
+    @property
+    def ok(self):
+        return bool(self.samples)
+
+    def summary(self):
+        attempts = len(self.samples) + len(self.errors)
+        if not self.samples:
+            error = self.errors[-1] if self.errors else "no samples"
+            return f"❌ {self.host}: FAILED - {error}"
+        values = percentiles(self.samples, 50, 95)
+        p50, p95 = values[50] * 1000, values[95] * 1000
+        line = f"✅ {self.host}: p50 {p50:.0f}ms, p95 {p95:.0f}ms, min {min(self.samples) * 1000:.0f}ms"
+        if self.errors:
+            line += f" ({len(self.errors)}/{attempts} failed)"
+        return line
+
+
+async def probe_host(host, port=443, samples=5, timeout=5.0):
+    """Open and close samples TCP connections to host, recording each connect time"""
+    result = ProbeResult(host, port)
+    for _ in range(samples):
+        started = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except asyncio.TimeoutError:
+            result.errors.append(f"timed out after {timeout:.0f}s")
+            continue
+        except OSError as e:
+            result.errors.append(str(e))
+            continue
+        result.samples.append(time.perf_counter() - started)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+    return result
+
+
+async def probe_hosts(hosts, port=443, samples=5, timeout=5.0):
+    """Probe every host concurrently, returns results in the same order as hosts"""
+    return await asyncio.gather(*(probe_host(host, port, samples, timeout) for host in hosts))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Parallel, incremental loudness normalization
+Runs an accurate two-pass ffmpeg loudnorm over every sound, one process per
+core. Files whose content hash matches the recorded normalized state are
+skipped, so a rerun with no changes finishes almost instantly.
+
+Usage:
+    python normalize_sounds.py [--workers N] [--force]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from sound_catalog import SOUNDS_DIR, measure_loudness, scan_sounds
+
+STATE_PATH = '.normalize_state.json'
+
+# Target loudness level (in LUFS), true peak and loudness range
+TARGET_LOUDNESS = -23.0
+TARGET_TRUE_PEAK = -2.0
+TARGET_LRA = 7.0
+SAMPLE_RATE = 48000
+
+# Recorded with every file so changing a target renormalizes everything
+SETTINGS_ID = f"I={TARGET_LOUDNESS}:TP={TARGET_TRUE_PEAK}:LRA={TARGET_LRA}:ar={SAMPLE_RATE}"
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_state(state_path=STATE_PATH):
+    try:
+        with open(state_path, encoding='utf-8') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, state_path=STATE_PATH):
+    temp_path = state_path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as fp:
+        json.dump(state, fp, ensure_ascii=False, indent=1)
+    os.replace(temp_path, state_path)
+
+
+def normalize_file(path):
+    """Two-pass loudnorm of one file, replaced atomically. Returns the new content hash."""
+    # Pass 1: measure the file
+    measured = measure_loudness(path, TARGET_LOUDNESS, TARGET_TRUE_PEAK, TARGET_LRA)
+
+    # Pass 2: apply a linear gain based on the measurement
+    loudnorm = (
+        f"loudnorm=I={TARGET_LOUDNESS}:TP={TARGET_TRUE_PEAK}:LRA={TARGET_LRA}"
+        f":measured_I={measured['input_i']}:measured_TP={measured['input_tp']}"
+        f":measured_LRA={measured['input_lra']}:measured_thresh={measured['input_thresh']}"
+        f":offset={measured['target_offset']}:linear=true"
+    )
+    # Keep the extension so ffmpeg writes the same container, and stay on the
+    # same filesystem so the final rename is atomic. The leading dot hides the
+    # half-written file from catalog scans running meanwhile
+    directory, filename = os.path.split(path)
+    name, extension = os.path.splitext(filename)
+    temp_path = os.path.join(directory, f".{name}.normalizing{extension}")
+    try:
+        subprocess.run(
+            ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y', '-i', path,
+             '-af', loudnorm, '-ar', str(SAMPLE_RATE), temp_path],
+            check=True, stdin=subprocess.DEVNULL,
+        )
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return file_hash(path)
+
+
+def normalize_library(sounds_dir=SOUNDS_DIR, workers=None, force=False):
+    state = load_state()
+    paths = sorted(scan_sounds(sounds_dir))
+
+    pending = []
+    for path in paths:
+        recorded = state.get(path)
+        if force or not recorded or recorded.get('settings') != SETTINGS_ID or recorded.get('sha256') != file_hash(path):
+            pending.append(path)
+
+    # Forget files that no longer exist
+    state = {path: entry for path, entry in state.items() if path in paths}
+
+    print(f"{len(paths) - len(pending)} sound(s) already normalized, {len(pending)} to process")
+    failed = 0
+    started = time.monotonic()
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(normalize_file, path): path for path in pending}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    state[path] = {'sha256': future.result(), 'settings': SETTINGS_ID}
+                    print(f"Normalized: {path}")
+                except Exception as e:
+                    failed += 1
+                    print(f"Error: failed to normalize {path}: {e}")
+                # Save as we go so an interrupted run keeps its progress
+                save_state(state)
+
+    save_state(state)
+    print(f"Sound normalization complete in {time.monotonic() - started:.1f}s ({failed} failed)")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loudness-normalize every sound in the library")
+    parser.add_argument('--sounds-dir', default=SOUNDS_DIR)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--force', action='store_true', help="Renormalize files even if they are unchanged")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.sounds_dir):
+        print(f"Error: Directory '{args.sounds_dir}' not found.")
+        raise SystemExit(1)
+    raise SystemExit(1 if normalize_library(args.sounds_dir, args.workers, args.force) else 0)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Pre-encoded Opus sound cache
+Transcodes every file in sounds/<category>/ into 48 kHz stereo Opus once,
+so playback can stream packets straight to Discord without spawning ffmpeg
+or re-encoding each frame.
+
+Run this directly to build the cache offline:
+    python opus_cache.py
+"""
+
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import discord
+from discord.oggparse import OggStream
+
+from sound_catalog import SOUNDS_DIR, SoundCatalog
+
+CACHE_DIR = '.opus_cache'
+
+# Same encoder settings discord.FFmpegOpusAudio uses: 48 kHz stereo, 20 ms frames
+FFMPEG_OPUS_ARGS = [
+    '-map_metadata', '-1',
+    '-f', 'opus',
+    '-c:a', 'libopus',
+    '-ar', '48000',
+    '-ac', '2',
+    '-b:a', '128k',
+    '-loglevel', 'warning',
+]
+
+
+def cache_path_for(sound_file):
+    """Return the cache file path for a sound file"""
+    relative = os.path.relpath(sound_file, SOUNDS_DIR)
+    return os.path.join(CACHE_DIR, os.path.splitext(relative)[0] + '.opus')
+
+
+def is_cached(sound_file):
+    """Check that a cache file exists and is newer than its source"""
+    cache_file = cache_path_for(sound_file)
+    try:
+        return os.path.getmtime(cache_file) >= os.path.getmtime(sound_file)
+    except OSError:
+        return False
+
+
+def encode_sound(sound_file, force=False):
+    """Transcode one sound into the cache, returns the cache file path"""
+    cache_file = cache_path_for(sound_file)
+    if not force and is_cached(sound_file):
+        return cache_file
+
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    temp_file = cache_file + '.tmp'
+    subprocess.run(
+        ['ffmpeg', '-y', '-i', sound_file, *FFMPEG_OPUS_ARGS, temp_file],
+        check=True,
+        stdin=subprocess.DEVNULL,
+    )
+    # Rename into place so a half-written file is never picked up
+    os.replace(temp_file, cache_file)
+    return cache_file
+
+
+def remove_cached(sound_file):
+    """Delete the cache file of a sound that was removed from the library"""
+    try:
+        os.remove(cache_path_for(sound_file))
+    except FileNotFoundError:
+        pass
+
+
+def rename_cached(old_file, new_file):
+    """Move a cache file along with its renamed source, keeps it valid without re-encoding"""
+    new_cache = cache_path_for(new_file)
+    os.makedirs(os.path.dirname(new_cache), exist_ok=True)
+    try:
+        os.replace(cache_path_for(old_file), new_cache)
+    except FileNotFoundError:
+        pass
+
+
+def build_cache(sound_files=None, workers=None, force=False):
+    """Encode every sound that is missing or stale in the cache, or all of them with force"""
+    if sound_files is None:
+        sound_files = list(SoundCatalog().load().sound_map.values())
+    pending = [f for f in sound_files if force or not is_cached(f)]
+    if not pending:
+        return 0
+
+    print(f"Encoding {len(pending)} sound(s) into the Opus cache...")
+    encoded = 0
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = {pool.submit(encode_sound, f, force): f for f in pending}
+        for future, sound_file in futures.items():
+            try:
+                future.result()
+                encoded += 1
+            except Exception as e:
+                print(f"Failed to encode {sound_file}: {e}")
+    print(f"Opus cache ready ({encoded}/{len(pending)} encoded)")
+    return encoded
+
+
+def load_packets(cache_file):
+    """Read all Opus audio packets from a cached Ogg Opus file"""
+    with open(cache_file, 'rb') as fp:
+        return [
+            packet for packet in OggStream(fp).iter_packets()
+            # Skip the Ogg Opus header packets, they are not audio
+            if not packet.startswith((b'OpusHead', b'OpusTags'))
+        ]
+
+
+class OpusPacketSource(discord.AudioSource):
+    """Audio source that passes pre-encoded Opus packets straight through"""
+
+    def __init__(self, packets):
+        self._packets = iter(packets)
+
+    def read(self):
+        return next(self._packets, b'')
+
+    def is_opus(self):
+        return True
+
+
+def get_audio_source(sound_file):
+    """Return a passthrough source if the sound is cached, otherwise fall back to ffmpeg"""
+    if is_cached(sound_file):
+        try:
+            return OpusPacketSource(load_packets(cache_path_for(sound_file)))
+        except Exception as e:
+            print(f"Failed to read cached sound {sound_file}: {e}")
+    return discord.FFmpegPCMAudio(sound_file)
+
+
+if __name__ == "__main__":
+    build_cache()
@@ -0,0 +1,54 @@
+"""
+Soundboard page prefetch
+When a page is rendered, its sounds are loaded into the audio cache on a
+small thread pool so the first click on a visible button plays from memory.
+Each soundboard message has one batch in flight: moving to another page
+cancels the loads that have not started yet, and a cap on pending loads
+keeps fast page flipping from piling up disk reads.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PagePrefetcher:
+    def __init__(self, cache, workers, max_pending):
+        self.cache = cache
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='prefetch')
+        # soundboard message id -> futures of the page it shows
+        self._batches = {}
+        self._lock = threading.Lock()
+        # Sounds actually read into the audio cache, not ones already there or in the pack
+        self.loaded = 0
+        self.cancelled = 0
+
+    def prefetch(self, message_id, sounds):
+        """Warm (key, sound_file) pairs for the page a message now shows, replacing its previous batch"""
+        self.cancel(message_id)
+        for done_id in [i for i, batch in self._batches.items() if all(f.done() for f in batch)]:
+            del self._batches[done_id]
+        pending = sum(not f.done() for batch in self._batches.values() for f in batch)
+
+        batch = []
+        for key, sound_file in sounds:
+            if pending >= self.max_pending:
+                break
+            batch.append(self._pool.submit(self._warm, key, sound_file))
+            pending += 1
+        if batch:
+            self._batches[message_id] = batch
+
+    def cancel(self, message_id):
+        """Drop loads for a message that have not started yet"""
+        cancelled = sum(f.cancel() for f in self._batches.pop(message_id, ()))
+        with self._lock:
+            self.cancelled += cancelled
+
+    def _warm(self, key, sound_file):
+        try:
+            if self.cache.warm(key, sound_file):
+                with self._lock:
+                    self.loaded += 1
+        except Exception as e:
+            print(f"Failed to prefetch {sound_file}: {e}")
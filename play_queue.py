@@ -0,0 +1,66 @@
+"""
+Per-guild playback queue
+Holds clicks that arrive while the mixer is full instead of rejecting them.
+Items are started from the mixer's per-sound after callback, which runs on
+the audio player thread, so the queue is guarded by a thread lock.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+
+class QueueError(Exception):
+    """Raised when a sound cannot be queued"""
+
+
+class QueuedSound:
+    def __init__(self, sound_key, sound_file, label, user_id, priority=0):
+        self.sound_key = sound_key
+        self.sound_file = sound_file
+        self.label = label
+        self.user_id = user_id
+        self.priority = priority
+        self.queued_at = time.monotonic()
+
+
+class PlayQueue:
+    def __init__(self, max_depth, max_per_user):
+        self.max_depth = max_depth
+        self.max_per_user = max_per_user
+        # Heap of (-priority, sequence, item): higher priority first, then FIFO
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, item):
+        """Queue a sound and return its 1-based position"""
+        with self._lock:
+            if len(self._heap) >= self.max_depth:
+                raise QueueError(f"The queue is full ({self.max_depth} sounds)")
+            queued_by_user = sum(1 for _, _, queued in self._heap if queued.user_id == item.user_id)
+            if queued_by_user >= self.max_per_user:
+                raise QueueError(f"You already have {self.max_per_user} sounds queued")
+            entry = (-item.priority, next(self._counter), item)
+            heapq.heappush(self._heap, entry)
+            return sorted(self._heap).index(entry) + 1
+
+    def pop(self):
+        """Remove and return the next sound, or None if the queue is empty"""
+        with self._lock:
+            if not self._heap:
+                return None
+            return heapq.heappop(self._heap)[2]
+
+    def clear(self):
+        with self._lock:
+            self._heap.clear()
+
+    def snapshot(self):
+        """Return the queued sounds in playback order"""
+        with self._lock:
+            return [item for _, _, item in sorted(self._heap)]
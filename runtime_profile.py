@@ -0,0 +1,35 @@
+"""
+Gateway and cache profiles
+The default profile keeps discord.py's stock intents and caches plus
+message_content for prefix commands. The lean profile subscribes only to
+what the soundboard uses (guilds and voice states), keeps no message cache,
+caches only members that are in voice and never chunks, so Discord sends
+far fewer events; commands are then used as slash commands.
+"""
+
+import discord
+
+
+def build_intents(lean):
+    if lean:
+        intents = discord.Intents.none()
+        intents.guilds = True
+        intents.voice_states = True
+        return intents
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.voice_states = True
+    return intents
+
+
+def bot_options(lean):
+    """Keyword arguments for the Bot constructor of a profile"""
+    intents = build_intents(lean)
+    if not lean:
+        return {'intents': intents}
+    return {
+        'intents': intents,
+        'max_messages': None,
+        'chunk_guilds_at_startup': False,
+        'member_cache_flags': discord.MemberCacheFlags.from_intents(intents),
+    }
@@ -0,0 +1,97 @@
+"""
+Tunable bot settings
+Every value can be overridden with an environment variable of the same name.
+"""
+
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def _env_list(name, default):
+    value = os.environ.get(name)
+    return [item.strip() for item in value.split(',') if item.strip()] if value else default
+
+
+# Memory ceiling for decoded/encoded sounds kept in RAM (megabytes)
+AUDIO_CACHE_MAX_MB = _env_int('AUDIO_CACHE_MAX_MB', 64)
+
+# Threads loading the sounds of a freshly shown soundboard page into the audio cache,
+# and the most loads queued at once across all boards
+PREFETCH_WORKERS = _env_int('PREFETCH_WORKERS', 2)
+PREFETCH_MAX_PENDING = _env_int('PREFETCH_MAX_PENDING', 60)
+
+# Seconds a voice connection may sit idle before the bot leaves the channel
+VOICE_IDLE_TIMEOUT = _env_int('VOICE_IDLE_TIMEOUT', 300)
+
+# Seconds between checks of sounds/ for added, removed or renamed files (0 disables)
+SOUND_RELOAD_INTERVAL = _env_int('SOUND_RELOAD_INTERVAL', 30)
+
+# Maximum number of sounds mixed at the same time in one guild
+MIXER_MAX_VOICES = _env_int('MIXER_MAX_VOICES', 4)
+
+# Clicks that arrive while the mixer is full wait in a per-guild queue
+PLAY_QUEUE_MAX_DEPTH = _env_int('PLAY_QUEUE_MAX_DEPTH', 20)
+PLAY_QUEUE_MAX_PER_USER = _env_int('PLAY_QUEUE_MAX_PER_USER', 3)
+# Set to 0 to queue moderators' clicks in plain arrival order
+PLAY_QUEUE_MODERATOR_PRIORITY = _env_int('PLAY_QUEUE_MODERATOR_PRIORITY', 1)
+
+# Voice connects give up after VOICE_CONNECT_DEADLINE seconds in total; retries
+# back off exponentially from VOICE_BACKOFF_BASE up to VOICE_BACKOFF_CAP seconds
+VOICE_CONNECT_DEADLINE = _env_float('VOICE_CONNECT_DEADLINE', 30)
+VOICE_CONNECT_ATTEMPT_TIMEOUT = _env_float('VOICE_CONNECT_ATTEMPT_TIMEOUT', 15)
+VOICE_BACKOFF_BASE = _env_float('VOICE_BACKOFF_BASE', 0.5)
+VOICE_BACKOFF_CAP = _env_float('VOICE_BACKOFF_CAP', 8)
+
+# Circuit breaker: consecutive connect failures that pause an endpoint, and
+# the first/maximum pause in seconds (doubling after each failed trial)
+VOICE_BREAKER_FAILURES = _env_int('VOICE_BREAKER_FAILURES', 3)
+VOICE_BREAKER_COOLDOWN = _env_float('VOICE_BREAKER_COOLDOWN', 15)
+VOICE_BREAKER_MAX_COOLDOWN = _env_float('VOICE_BREAKER_MAX_COOLDOWN', 300)
+
+# Hosts checked by /voicenetwork (comma-separated), samples per host and per-connect timeout
+VOICE_PROBE_HOSTS = _env_list('VOICE_PROBE_HOSTS', [
+    "discord.com",
+    "gateway.discord.gg",
+    "c-fra16-e2ce8198.discord.media",
+    "c-fra16-e2ce8199.discord.media",
+    "c-fra16-e2ce8200.discord.media",
+    "c-fra16-e2ce8201.discord.media",
+])
+VOICE_PROBE_SAMPLES = _env_int('VOICE_PROBE_SAMPLES', 5)
+VOICE_PROBE_TIMEOUT = _env_float('VOICE_PROBE_TIMEOUT', 5)
+
+# Opt-in: join a member's voice channel before the first click in guilds whose
+# soundboard was used in the last VOICE_PREWARM_RECENT_USE seconds
+VOICE_PREWARM = _env_int('VOICE_PREWARM', 0)
+VOICE_PREWARM_RECENT_USE = _env_int('VOICE_PREWARM_RECENT_USE', 1800)
+# Seconds a prewarmed connection is held if nobody plays a sound
+VOICE_PREWARM_IDLE = _env_int('VOICE_PREWARM_IDLE', 120)
+# Prewarmed, still unused connections across all guilds, and prewarms per guild per hour
+VOICE_PREWARM_MAX_CONNECTIONS = _env_int('VOICE_PREWARM_MAX_CONNECTIONS', 10)
+VOICE_PREWARM_MAX_PER_GUILD_HOURLY = _env_int('VOICE_PREWARM_MAX_PER_GUILD_HOURLY', 4)
+
+# Sharding: 0 runs a single plain bot, -1 lets Discord pick the shard count,
+# N > 0 runs an AutoShardedBot with N shards in total
+SHARD_COUNT = _env_int('SHARD_COUNT', 0)
+# Shards this process runs (all of them if empty); set by shard_supervisor.py
+SHARD_IDS = [int(shard_id) for shard_id in _env_list('SHARD_IDS', [])]
+# Set to 1 when a supervisor owns the manifest, Opus cache and sound pack;
+# the process then only reads them instead of building its own copies
+SHARED_ASSETS = _env_int('SHARED_ASSETS', 0)
+
+# 1 runs with minimal intents and caches (guilds and voice states only, no
+# message cache); commands then work as slash commands only
+LEAN_RUNTIME = _env_int('LEAN_RUNTIME', 0)
+# Register the slash commands with Discord on startup
+SYNC_APP_COMMANDS = _env_int('SYNC_APP_COMMANDS', 1)
+
+# Local Prometheus scrape endpoint for hot-path metrics, 0 disables it
+METRICS_PORT = _env_int('METRICS_PORT', 9108)
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
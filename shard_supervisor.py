@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Shard supervisor
+Runs memer.py as several worker processes, each an AutoShardedBot owning a
+group of shards, so gateway handling and voice encoding spread over every
+core instead of sharing one GIL. The supervisor builds the catalog
+manifest, Opus cache and sound pack once; workers run with SHARED_ASSETS=1
+and map the same pack read-only, so the encoded audio is held in the page
+cache only once. Workers that exit are restarted with exponential backoff.
+
+Usage:
+    python shard_supervisor.py [--shards N] [--processes P]
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from settings import METRICS_PORT, SHARD_COUNT, SOUND_RELOAD_INTERVAL
+from sound_catalog import SoundCatalog
+from sound_pack import update_sound_assets
+
+# Restart delays for a crashing worker, reset once it stays up for RESTART_RESET seconds
+RESTART_BASE = 1.0
+RESTART_CAP = 60.0
+RESTART_RESET = 60.0
+
+
+def shard_groups(shard_count, processes):
+    """Split shard ids round-robin into one group per process"""
+    processes = max(1, min(processes, shard_count))
+    return [list(range(first, shard_count, processes)) for first in range(processes)]
+
+
+class Worker:
+    def __init__(self, index, shard_ids, shard_count):
+        self.index = index
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.process = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.next_start = 0.0
+
+    def start(self):
+        env = dict(os.environ,
+                   SHARD_COUNT=str(self.shard_count),
+                   SHARD_IDS=','.join(map(str, self.shard_ids)),
+                   SHARED_ASSETS='1',
+                   # One metrics port per worker so they don't collide
+                   METRICS_PORT=str(METRICS_PORT + self.index if METRICS_PORT > 0 else 0))
+        self.process = subprocess.Popen([sys.executable, 'memer.py'], env=env)
+        self.started_at = time.monotonic()
+        print(f"Started worker {self.index} (pid {self.process.pid}) for shards {self.shard_ids}")
+
+    def check(self):
+        """Restart the worker if it exited, with backoff if it keeps crashing"""
+        now = time.monotonic()
+        if self.process is None:
+            if now >= self.next_start:
+                self.start()
+            return
+        code = self.process.poll()
+        if code is None:
+            if self.restarts and now - self.started_at > RESTART_RESET:
+                self.restarts = 0
+            return
+
+        delay = min(RESTART_CAP, RESTART_BASE * 2 ** self.restarts)
+        self.restarts += 1
+        self.process = None
+        self.next_start = now + delay
+        print(f"Worker {self.index} exited with code {code}, restarting in {delay:.0f}s")
+
+    def stop(self, timeout=10):
+        if self.process is None or self.process.poll() is not None:
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def refresh_assets(catalog, initial=False):
+    """Bring the manifest, Opus cache and sound pack up to date for the workers"""
+    changes = catalog.scan()
+    if not changes and not initial:
+        return
+    # Workers remap a rebuilt pack on their next reload tick, and only then
+    # see the new manifest, so every sound they pick up is already encoded
+    update_sound_assets(changes, initial=initial)
+    catalog.apply(changes)
+    if changes:
+        print(f"Sound library updated: {changes.summary()}")
+
+
+def run(shard_count, processes):
+    catalog = SoundCatalog()
+    refresh_assets(catalog, initial=True)
+
+    workers = [Worker(i, group, shard_count) for i, group in enumerate(shard_groups(shard_count, processes))]
+    stopping = False
+
+    def handle_signal(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    next_refresh = time.monotonic() + SOUND_RELOAD_INTERVAL
+    try:
+        while not stopping:
+            for worker in workers:
+                worker.check()
+            if SOUND_RELOAD_INTERVAL > 0 and time.monotonic() >= next_refresh:
+                try:
+                    refresh_assets(catalog)
+                except Exception as e:
+                    print(f"Error refreshing sound assets: {e}")
+                next_refresh = time.monotonic() + SOUND_RELOAD_INTERVAL
+            time.sleep(1)
+    finally:
+        print("Stopping workers...")
+        for worker in workers:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the soundboard as several sharded worker processes")
+    parser.add_argument('--shards', type=int, default=SHARD_COUNT if SHARD_COUNT > 0 else None,
+                        help="Total shard count (default: SHARD_COUNT, or one per process)")
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    run(args.shards or args.processes, args.processes)
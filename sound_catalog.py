@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Shared sound catalog
+Indexes sounds/<category>/ into sound_map and categories, and keeps an
+on-disk manifest of per-sound metadata keyed by path, mtime and size so
+only new or changed files are probed on startup.
+
+Run this directly to refresh the manifest and print a summary:
+    python sound_catalog.py
+"""
+
+import json
+import os
+import re
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+SOUNDS_DIR = 'sounds'
+MANIFEST_PATH = '.sound_catalog.json'
+MANIFEST_VERSION = 1
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.m4a')
+
+
+def is_sound_file(filename):
+    """Skip system files like 'Zone.Identifier', hidden files and non-audio files"""
+    if 'Zone' in filename or filename.startswith('.'):
+        return False
+    return os.path.splitext(filename)[1].lower() in AUDIO_EXTENSIONS
+
+
+def scan_sounds(sounds_dir=SOUNDS_DIR):
+    """Stat every sound file, returns path -> (category, name, mtime, size)"""
+    found = {}
+    for category_entry in os.scandir(sounds_dir):
+        if not category_entry.is_dir():
+            continue
+        for file_entry in os.scandir(category_entry.path):
+            if not file_entry.is_file() or not is_sound_file(file_entry.name):
+                continue
+            stat = file_entry.stat()
+            name = os.path.splitext(file_entry.name)[0]
+            found[file_entry.path] = (category_entry.name, name, stat.st_mtime, stat.st_size)
+    return found
+
+
+def probe_stream_info(path):
+    """Read duration, codec, sample rate and channel count with ffprobe"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'a:0',
+         '-show_entries', 'stream=codec_name,sample_rate,channels:format=duration',
+         '-of', 'json', path],
+        capture_output=True, text=True, check=True,
+    )
+    data = json.loads(result.stdout)
+    stream = (data.get('streams') or [{}])[0]
+    duration = data.get('format', {}).get('duration')
+    return {
+        'duration': float(duration) if duration else None,
+        'codec': stream.get('codec_name'),
+        'sample_rate': int(stream['sample_rate']) if stream.get('sample_rate') else None,
+        'channels': stream.get('channels'),
+    }
+
+
+def measure_loudness(path, target_i=-23.0, target_tp=-2.0, target_lra=7.0):
+    """Run a loudnorm analysis pass and return ffmpeg's measured values"""
+    result = subprocess.run(
+        ['ffmpeg', '-hide_banner', '-nostats', '-i', path,
+         '-af', f'loudnorm=I={target_i}:TP={target_tp}:LRA={target_lra}:print_format=json',
+         '-f', 'null', '-'],
+        capture_output=True, text=True, check=True, stdin=subprocess.DEVNULL,
+    )
+    # loudnorm prints its JSON block at the end of stderr
+    match = re.search(r'\{[^{}]*"input_i"[^{}]*\}', result.stderr)
+    if not match:
+        raise RuntimeError(f"No loudnorm measurement in ffmpeg output for {path}")
+    return json.loads(match.group(0))
+
+
+def probe_sound(path):
+    """Collect all metadata stored in the manifest for one file"""
+    info = {'duration': None, 'codec': None, 'sample_rate': None, 'channels': None, 'loudness': None}
+    try:
+        info.update(probe_stream_info(path))
+        info['loudness'] = float(measure_loudness(path)['input_i'])
+    except Exception as e:
+        print(f"Failed to probe {path}: {e}")
+    return info
+
+
+class CatalogChanges:
+    """Differences found by a catalog rescan, as lists of file paths"""
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.changed = []
+        # (old_path, new_path) pairs
+        self.renamed = []
+        # The full set of entries after the rescan, and the ones before it
+        self.entries = {}
+        self.previous = {}
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed or self.renamed)
+
+    def affected_keys(self):
+        """sound_map keys whose cached audio is no longer valid"""
+        paths = self.removed + self.changed + [old for old, _ in self.renamed]
+        return [self.previous[path]['key'] for path in paths if path in self.previous]
+
+    def affected_categories(self):
+        """Categories whose list of sounds changed"""
+        categories = set()
+        for path in self.removed + [old for old, _ in self.renamed]:
+            categories.add(self.previous[path]['category'])
+        for path in self.added + [new for _, new in self.renamed]:
+            categories.add(self.entries[path]['category'])
+        return categories
+
+    def summary(self):
+        return (f"{len(self.added)} added, {len(self.removed)} removed, "
+                f"{len(self.changed)} changed, {len(self.renamed)} renamed")
+
+
+class SoundCatalog:
+    def __init__(self, sounds_dir=SOUNDS_DIR, manifest_path=MANIFEST_PATH, read_only=False):
+        self.sounds_dir = sounds_dir
+        self.manifest_path = manifest_path
+        # Read-only catalogs follow the manifest another process owns, never probing or writing it
+        self.read_only = read_only
+        # mtime of the manifest last read by scan_manifest()
+        self._manifest_mtime = None
+        # path -> manifest entry (mtime, size, key, category, name and probed metadata)
+        self.entries = {}
+        self.sound_map = {}
+        self.categories = {}
+        self.sorted_categories = []
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, encoding='utf-8') as fp:
+                manifest = json.load(fp)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('version') != MANIFEST_VERSION:
+            return {}
+        return manifest.get('sounds', {})
+
+    def _write_manifest(self):
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as fp:
+            json.dump({'version': MANIFEST_VERSION, 'sounds': self.entries}, fp, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.manifest_path)
+
+    def scan(self, workers=None):
+        """Rescan the sounds directory and probe only new or changed files.
+        Returns the differences against the live index without applying them."""
+        # Before the first load the manifest on disk is the baseline
+        previous = self.entries if self.entries else self._read_manifest()
+        found = scan_sounds(self.sounds_dir)
+        changes = CatalogChanges()
+
+        # A rename keeps size and mtime, so match vanished files to new ones
+        vanished = {}
+        for path, entry in previous.items():
+            if path not in found:
+                vanished.setdefault((entry['mtime'], entry['size']), []).append(path)
+
+        to_probe = []
+        for path, (category, name, mtime, size) in found.items():
+            key = f"{category}-{name}"
+            entry = previous.get(path)
+            if entry is not None and entry['mtime'] == mtime and entry['size'] == size:
+                entry = dict(entry)
+            elif entry is None and vanished.get((mtime, size)):
+                old_path = vanished[(mtime, size)].pop()
+                entry = dict(previous[old_path])
+                changes.renamed.append((old_path, path))
+            else:
+                if entry is None:
+                    changes.added.append(path)
+                else:
+                    changes.changed.append(path)
+                entry = {'mtime': mtime, 'size': size}
+                to_probe.append(path)
+            entry.update(category=category, name=name, key=key)
+            changes.entries[path] = entry
+
+        for paths in vanished.values():
+            changes.removed.extend(paths)
+        changes.previous = previous
+
+        if to_probe:
+            print(f"Probing {len(to_probe)} new or changed sound(s)...")
+            with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+                for path, info in zip(to_probe, pool.map(probe_sound, to_probe)):
+                    changes.entries[path].update(info)
+        return changes
+
+    def scan_manifest(self):
+        """Diff the live index against the manifest another process maintains, without probing.
+        Returns no changes while the manifest file is unchanged."""
+        changes = CatalogChanges()
+        changes.entries = self.entries
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime_ns
+        except OSError:
+            return changes
+        if mtime == self._manifest_mtime:
+            return changes
+        self._manifest_mtime = mtime
+
+        previous = self.entries
+        current = self._read_manifest()
+        vanished = {}
+        for path, entry in previous.items():
+            if path not in current:
+                vanished.setdefault((entry['mtime'], entry['size']), []).append(path)
+        for path, entry in current.items():
+            old = previous.get(path)
+            if old is None:
+                if vanished.get((entry['mtime'], entry['size'])):
+                    changes.renamed.append((vanished[(entry['mtime'], entry['size'])].pop(), path))
+                else:
+                    changes.added.append(path)
+            elif (old['mtime'], old['size']) != (entry['mtime'], entry['size']):
+                changes.changed.append(path)
+        for paths in vanished.values():
+            changes.removed.extend(paths)
+        changes.entries = current
+        changes.previous = previous
+        return changes
+
+    def apply(self, changes):
+        """Swap in the result of scan() and persist the manifest if anything changed"""
+        self.entries = changes.entries
+        self._build_index()
+        if changes and not self.read_only:
+            self._write_manifest()
+
+    def load(self, workers=None):
+        """Scan the sounds directory, probing only files that are new or changed.
+        A read-only catalog takes the owner's manifest as is."""
+        changes = self.scan_manifest() if self.read_only else self.scan(workers)
+        self.apply(changes)
+        return self
+
+    def _build_index(self):
+        # Update in place so modules holding references to these see the changes
+        sound_map = {}
+        categories = {}
+        for path, entry in self.entries.items():
+            categories.setdefault(entry['category'], []).append(entry['name'])
+            sound_map[entry['key']] = path
+
+        # Sort categories alphabetically and sounds within each category
+        for names in categories.values():
+            names.sort()
+        self.sound_map.clear()
+        self.sound_map.update(sound_map)
+        self.categories.clear()
+        self.categories.update(categories)
+        self.sorted_categories[:] = sorted(categories.keys())
+
+    def info(self, key):
+        """Return the manifest entry for a sound_map key"""
+        path = self.sound_map.get(key)
+        return self.entries.get(path) if path else None
+
+
+if __name__ == "__main__":
+    catalog = SoundCatalog().load()
+    for category in catalog.sorted_categories:
+        print(f"{category}: {len(catalog.categories[category])} sounds")
+    print(f"{len(catalog.sound_map)} sounds indexed in {MANIFEST_PATH}")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped sound pack
+Packs the pre-encoded Opus packets of every sound into one file with an
+offset index. The bot maps it read-only and plays packets as memoryview
+slices of the mapping: startup opens a single file, playback copies nothing,
+and the OS page cache is shared by every process that maps the pack.
+
+Run this directly to rebuild the pack from the Opus cache:
+    python sound_pack.py
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+import discord
+
+from opus_cache import build_cache, cache_path_for, is_cached, load_packets, remove_cached, rename_cached
+from sound_catalog import SoundCatalog
+
+PACK_PATH = '.sound_pack'
+PACK_VERSION = 1
+MAGIC = b'MEMERPK1'
+# Magic, index offset, index length
+HEADER = struct.Struct('<8sQQ')
+
+
+def build_pack(entries=None, pack_path=PACK_PATH):
+    """Write every cached sound into a new pack, returns the number of sounds packed.
+    entries maps sound paths to catalog entries, defaults to a fresh catalog scan."""
+    if entries is None:
+        entries = SoundCatalog().load().entries
+
+    index = {}
+    temp_path = pack_path + '.tmp'
+    with open(temp_path, 'wb') as fp:
+        fp.write(HEADER.pack(MAGIC, 0, 0))
+        for path, entry in sorted(entries.items()):
+            if not is_cached(path):
+                continue
+            try:
+                packets = load_packets(cache_path_for(path))
+            except Exception as e:
+                print(f"Failed to read cached sound {path}: {e}")
+                continue
+            lengths = array('H', (len(packet) for packet in packets))
+            # Packet lengths are read back with memoryview.cast('H'), keep them aligned
+            if fp.tell() % lengths.itemsize:
+                fp.write(b'\0')
+            table = fp.tell()
+            lengths.tofile(fp)
+            data = fp.tell()
+            for packet in packets:
+                fp.write(packet)
+            index[entry['key']] = {
+                'path': path, 'mtime': entry['mtime'], 'size': entry['size'],
+                'table': table, 'packets': len(packets), 'data': data,
+            }
+
+        index_offset = fp.tell()
+        encoded = json.dumps({'version': PACK_VERSION, 'byteorder': sys.byteorder, 'sounds': index},
+                             ensure_ascii=False).encode('utf-8')
+        fp.write(encoded)
+        fp.seek(0)
+        fp.write(HEADER.pack(MAGIC, index_offset, len(encoded)))
+    # Rename into place; processes that mapped the old pack keep reading it safely
+    os.replace(temp_path, pack_path)
+    return len(index)
+
+
+class PackedOpusSource(discord.AudioSource):
+    """Serves one sound's packets as memoryview slices of the mapped pack"""
+
+    def __init__(self, view, lengths, position):
+        self._view = view
+        self._lengths = lengths
+        self._position = position
+        self._index = 0
+
+    def read(self):
+        if self._index >= len(self._lengths):
+            return b''
+        start = self._position
+        self._position += self._lengths[self._index]
+        self._index += 1
+        return self._view[start:self._position]
+
+    def is_opus(self):
+        return True
+
+
+class SoundPack:
+    def __init__(self, path, mapping, sounds, identity=None):
+        self.path = path
+        # (inode, mtime) of the file that was mapped, to notice a rebuilt pack
+        self.identity = identity
+        self._mapping = mapping
+        self._view = memoryview(mapping)
+        self._sounds = sounds
+        # Keys whose source file was checked against the pack, True if it still matches
+        self._checked = {}
+
+    @classmethod
+    def open(cls, path=PACK_PATH):
+        with open(path, 'rb') as fp:
+            mapping = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(fp.fileno())
+        magic, index_offset, index_length = HEADER.unpack_from(mapping)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a sound pack")
+        index = json.loads(bytes(mapping[index_offset:index_offset + index_length]))
+        if index.get('version') != PACK_VERSION or index.get('byteorder') != sys.byteorder:
+            raise ValueError(f"{path} was built by an incompatible version, rebuild it")
+        return cls(path, mapping, index['sounds'], (stat.st_ino, stat.st_mtime_ns))
+
+    def __len__(self):
+        return len(self._sounds)
+
+    @property
+    def nbytes(self):
+        return len(self._mapping)
+
+    def replaced(self):
+        """True if the pack file was rebuilt since it was mapped"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns) != self.identity
+
+    def covers(self, entries):
+        """True if the pack holds an up-to-date copy of every catalog entry"""
+        for path, entry in entries.items():
+            sound = self._sounds.get(entry['key'])
+            if sound is None or (sound['path'], sound['mtime'], sound['size']) != (path, entry['mtime'], entry['size']):
+                return False
+        return True
+
+    def _lookup(self, key, sound_file):
+        sound = self._sounds.get(key)
+        if sound is None:
+            return None
+        valid = self._checked.get(key)
+        if valid is None:
+            # Stat once per key, reload_sounds() calls invalidate() when a file changes
+            try:
+                stat = os.stat(sound_file)
+                valid = (sound['path'], sound['mtime'], sound['size']) == (sound_file, stat.st_mtime, stat.st_size)
+            except OSError:
+                valid = False
+            self._checked[key] = valid
+        return sound if valid else None
+
+    def source(self, key, sound_file):
+        """Return a zero-copy source for a sound, or None if the pack has no current copy of it"""
+        sound = self._lookup(key, sound_file)
+        if sound is None:
+            return None
+        table = sound['table']
+        lengths = self._view[table:table + 2 * sound['packets']].cast('H')
+        return PackedOpusSource(self._view, lengths, sound['data'])
+
+    def prefetch(self, key, sound_file):
+        """Ask the OS to read a sound's pages in ahead of playback, returns False if the pack can't serve it"""
+        sound = self._lookup(key, sound_file)
+        if sound is None:
+            return False
+        if hasattr(self._mapping, 'madvise'):
+            table = sound['table']
+            end = sound['data'] + sum(self._view[table:table + 2 * sound['packets']].cast('H'))
+            start = table - table % mmap.PAGESIZE
+            self._mapping.madvise(mmap.MADV_WILLNEED, start, end - start)
+        return True
+
+    def invalidate(self, key):
+        """Stop serving a sound whose file changed, it falls back to the regular cache"""
+        self._checked[key] = False
+
+
+def load_pack(path=PACK_PATH):
+    """Open the sound pack if one was built, None otherwise"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return SoundPack.open(path)
+    except Exception as e:
+        print(f"Failed to open sound pack {path}: {e}")
+        return None
+
+
+def refresh_pack(entries, pack=None):
+    """Rebuild the pack if it does not cover every catalog entry. Returns the pack
+    to map instead of the current one, or None if the current one is complete."""
+    if pack is None:
+        # Nothing mapped yet, a complete pack on disk is worth mapping as is
+        pack = load_pack()
+        if pack is not None and pack.covers(entries):
+            return pack
+    elif pack.covers(entries):
+        return None
+    packed = build_pack(dict(entries))
+    print(f"📼 Sound pack rebuilt with {packed} sounds")
+    return load_pack()
+
+
+def update_sound_assets(changes, pack=None, initial=False):
+    """Bring the Opus cache and the sound pack in line with a catalog rescan, before
+    or after catalog.apply(changes). initial also encodes every sound missing from the
+    cache, not only new ones. Returns the newly mapped pack if it was rebuilt."""
+    for old_path, new_path in changes.renamed:
+        rename_cached(old_path, new_path)
+    for path in changes.removed:
+        remove_cached(path)
+    # A replacement can be older than its cache file (cp -p, rsync -a), so re-encode it regardless
+    build_cache(changes.changed, force=True)
+    build_cache(list(changes.entries) if initial else changes.added)
+    return refresh_pack(changes.entries, pack)
+
+
+if __name__ == "__main__":
+    catalog = SoundCatalog().load()
+    build_cache(list(catalog.sound_map.values()))
+    packed = build_pack(catalog.entries)
+    print(f"Packed {packed}/{len(catalog.sound_map)} sounds into {PACK_PATH} "
+          f"({os.path.getsize(PACK_PATH) / 1024 / 1024:.1f} MB)")
@@ -0,0 +1,135 @@
+"""
+Voice server health tracking
+Records connect outcomes per (guild, voice endpoint) and drives a circuit
+breaker: after repeated failures an endpoint is skipped for a cooldown, then
+a single trial connect is let through (half-open) and its result decides
+whether the endpoint is healthy again or the cooldown doubles.
+"""
+
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+UNKNOWN_ENDPOINT = 'unknown'
+
+# Weight of the newest sample in the connect latency moving average
+LATENCY_EWMA_WEIGHT = 0.3
+
+
+class EndpointHealth:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.successes = 0
+        self.failures = 0
+        self.errors_4006 = 0
+        self.consecutive_failures = 0
+        self.avg_latency = None
+        self.last_close_code = None
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.trial_in_flight = False
+
+    @property
+    def success_rate(self):
+        total = self.successes + self.failures
+        return self.successes / total if total else None
+
+    def retry_after(self):
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+
+class VoiceHealthTracker:
+    def __init__(self, failure_threshold, base_cooldown, max_cooldown):
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        # (guild_id, endpoint) -> EndpointHealth
+        self._health = {}
+        # guild_id -> endpoint of the most recent connection attempt
+        self.last_endpoint = {}
+
+    def get(self, guild_id, endpoint=None):
+        """Return the health of an endpoint, None if no connect to it was recorded yet"""
+        endpoint = endpoint or self.last_endpoint.get(guild_id) or UNKNOWN_ENDPOINT
+        return self._health.get((guild_id, endpoint))
+
+    def _entry(self, guild_id, endpoint):
+        # Only recorded outcomes create entries, lookups never do
+        key = (guild_id, endpoint)
+        if key not in self._health:
+            self._health[key] = EndpointHealth(endpoint)
+        return self._health[key]
+
+    def retry_after(self, guild_id, endpoint=None):
+        """Seconds until an endpoint's open breaker lets a connect through, 0 if it would now"""
+        health = self.get(guild_id, endpoint)
+        return health.retry_after() if health else 0.0
+
+    def allow(self, guild_id, endpoint=None):
+        """Return True if a connect may be attempted, moving open breakers to half-open after their cooldown"""
+        health = self.get(guild_id, endpoint)
+        if health is None:
+            return True
+        if health.state == OPEN:
+            if health.retry_after() > 0:
+                return False
+            health.state = HALF_OPEN
+            health.trial_in_flight = False
+        if health.state == HALF_OPEN:
+            # Only one trial connect at a time while half-open
+            if health.trial_in_flight:
+                return False
+            health.trial_in_flight = True
+        return True
+
+    def record_success(self, guild_id, endpoint, latency):
+        endpoint = endpoint or UNKNOWN_ENDPOINT
+        self.last_endpoint[guild_id] = endpoint
+        health = self._entry(guild_id, endpoint)
+        health.successes += 1
+        health.consecutive_failures = 0
+        if health.avg_latency is None:
+            health.avg_latency = latency
+        else:
+            health.avg_latency += LATENCY_EWMA_WEIGHT * (latency - health.avg_latency)
+        if health.state != CLOSED:
+            print(f"Voice endpoint {endpoint} healthy again, closing breaker")
+        health.state = CLOSED
+        health.cooldown = 0.0
+        health.trial_in_flight = False
+
+    def record_failure(self, guild_id, endpoint, close_code=None):
+        endpoint = endpoint or self.last_endpoint.get(guild_id) or UNKNOWN_ENDPOINT
+        self.last_endpoint[guild_id] = endpoint
+        health = self._entry(guild_id, endpoint)
+        health.failures += 1
+        health.consecutive_failures += 1
+        health.last_close_code = close_code
+        if close_code == 4006:
+            health.errors_4006 += 1
+
+        if health.state == HALF_OPEN or health.consecutive_failures >= self.failure_threshold:
+            # Each re-open after a failed trial doubles the cooldown
+            health.cooldown = min(self.max_cooldown, health.cooldown * 2 if health.cooldown else self.base_cooldown)
+            health.opened_at = time.monotonic()
+            health.state = OPEN
+            health.trial_in_flight = False
+            print(f"Voice endpoint {endpoint} unhealthy, pausing connects for {health.cooldown:.0f}s")
+
+    def reset(self, guild_id=None):
+        """Forget health for one guild, or for every guild"""
+        if guild_id is None:
+            self._health.clear()
+            self.last_endpoint.clear()
+            return
+        for key in [key for key in self._health if key[0] == guild_id]:
+            del self._health[key]
+        self.last_endpoint.pop(guild_id, None)
+
+    def for_guild(self, guild_id):
+        return [health for (gid, _), health in self._health.items() if gid == guild_id]
@@ -0,0 +1,56 @@
+"""
+Predictive voice prewarm policy
+Decides when to join a voice channel ahead of the first click: only in
+guilds whose soundboard was used recently, with a cap on prewarmed
+connections held across all guilds and on prewarms per guild per hour, so
+members hopping in and out of voice cannot make the bot flap.
+"""
+
+import time
+from collections import deque
+
+PREWARM_WINDOW = 3600
+
+
+class VoicePrewarmPolicy:
+    def __init__(self, recent_use, max_connections, max_per_guild_hourly):
+        # Seconds since the last soundboard click for a guild to count as active
+        self.recent_use = recent_use
+        self.max_connections = max_connections
+        self.max_per_guild_hourly = max_per_guild_hourly
+        self._last_use = {}
+        # guild_id -> monotonic times of recent prewarms
+        self._history = {}
+        # Guilds holding a prewarmed connection nobody has played through yet
+        self.prewarmed = set()
+
+    def note_use(self, guild_id):
+        """Record a soundboard click in a guild"""
+        self._last_use[guild_id] = time.monotonic()
+
+    def should_prewarm(self, guild_id):
+        now = time.monotonic()
+        last_use = self._last_use.get(guild_id)
+        if last_use is None or now - last_use > self.recent_use:
+            return False
+        if guild_id in self.prewarmed or len(self.prewarmed) >= self.max_connections:
+            return False
+        history = self._history.get(guild_id)
+        if history:
+            while history and now - history[0] > PREWARM_WINDOW:
+                history.popleft()
+            if len(history) >= self.max_per_guild_hourly:
+                return False
+        return True
+
+    def started(self, guild_id):
+        self._history.setdefault(guild_id, deque()).append(time.monotonic())
+        self.prewarmed.add(guild_id)
+
+    def take(self, guild_id):
+        """Forget a guild's prewarmed connection once it is used or closed.
+        Returns True if there was one."""
+        if guild_id in self.prewarmed:
+            self.prewarmed.discard(guild_id)
+            return True
+        return False
@@ -0,0 +1,101 @@
+"""
+Per-guild voice session manager
+Reuses a healthy voice connection across clicks, moves it when the user is
+in a different channel, and disconnects after a period of inactivity.
+"""
+
+import asyncio
+import time
+
+
+class VoiceSessionManager:
+    def __init__(self, connect, idle_timeout):
+        # connect(guild, voice_channel) -> VoiceClient, used when no healthy session exists
+        self._connect = connect
+        self.idle_timeout = idle_timeout
+        self._locks = {}
+        self._last_activity = {}
+        self._idle_tasks = {}
+        # guild_id -> shorter idle timeout for a session nobody has used yet
+        self._idle_overrides = {}
+
+    def _lock_for(self, guild_id):
+        if guild_id not in self._locks:
+            self._locks[guild_id] = asyncio.Lock()
+        return self._locks[guild_id]
+
+    async def get(self, guild, voice_channel, idle_timeout=None):
+        """Return a connected voice client in voice_channel, reusing the current session if possible.
+        idle_timeout overrides the idle timeout until the next get() without one."""
+        async with self._lock_for(guild.id):
+            vc = guild.voice_client
+            if vc and vc.is_connected():
+                if vc.channel != voice_channel:
+                    try:
+                        await vc.move_to(voice_channel)
+                        print(f"Moved voice session to {voice_channel.name}")
+                    except Exception as e:
+                        print(f"Failed to move voice session, reconnecting: {e}")
+                        vc = await self._connect(guild, voice_channel)
+            else:
+                vc = await self._connect(guild, voice_channel)
+
+            if idle_timeout is None:
+                self._idle_overrides.pop(guild.id, None)
+            else:
+                self._idle_overrides[guild.id] = idle_timeout
+            self.touch(guild)
+            return vc
+
+    def touch(self, guild):
+        """Mark the guild's session as active and (re)arm its idle timer"""
+        self._last_activity[guild.id] = time.monotonic()
+        task = self._idle_tasks.get(guild.id)
+        if task is None or task.done():
+            self._idle_tasks[guild.id] = asyncio.create_task(self._idle_watch(guild))
+
+    async def _idle_watch(self, guild):
+        while True:
+            idle_timeout = self._idle_overrides.get(guild.id, self.idle_timeout)
+            idle_for = time.monotonic() - self._last_activity.get(guild.id, 0)
+            if idle_for < idle_timeout:
+                await asyncio.sleep(idle_timeout - idle_for)
+                continue
+
+            vc = guild.voice_client
+            if vc is None:
+                break
+            if vc.is_playing():
+                # Still in use, check again after another full timeout
+                self._last_activity[guild.id] = time.monotonic()
+                continue
+
+            async with self._lock_for(guild.id):
+                # A click may have reused or replaced the session while we waited for the lock
+                vc = guild.voice_client
+                idle_timeout = self._idle_overrides.get(guild.id, self.idle_timeout)
+                idle_for = time.monotonic() - self._last_activity.get(guild.id, 0)
+                if vc is not None and idle_for < idle_timeout:
+                    continue
+                if vc is not None:
+                    print(f"Closing idle voice session in guild {guild.id}")
+                    try:
+                        await vc.disconnect()
+                    except Exception as e:
+                        print(f"Error closing idle voice session: {e}")
+            break
+
+        if self._idle_tasks.get(guild.id) is asyncio.current_task():
+            del self._idle_tasks[guild.id]
+        self._last_activity.pop(guild.id, None)
+        self._idle_overrides.pop(guild.id, None)
+
+    async def close(self, guild):
+        """Disconnect the guild's session immediately"""
+        task = self._idle_tasks.pop(guild.id, None)
+        if task:
+            task.cancel()
+        self._last_activity.pop(guild.id, None)
+        self._idle_overrides.pop(guild.id, None)
+        if guild.voice_client:
+            await guild.voice_client.disconnect()